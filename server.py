@@ -6,18 +6,44 @@
 # - Estrategia adaptativa por fase del juego
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple, Optional
-from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Sequence, Tuple, Optional
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import asyncio
+import atexit
+import base64
+import binascii
+import bisect
+import contextlib
+import contextvars
+import functools
+import hashlib
+import heapq
+import hmac
+import inspect
+import json
+import logging
+import logging.handlers
 import math
+import mmap
+import queue
 import re
+import secrets
+import sqlite3
+import struct
 import threading
+import time
 import os
+import random
 import sys
 
 # === Dependencias externas opcionales ===
 try:
-    from wordfreq import top_n_list
+    from wordfreq import available_languages, top_n_list
 except Exception: # pragma: no cover
+    available_languages = None
     top_n_list = None
 
 try:
@@ -31,10 +57,304 @@ try:
 except Exception: # pragma: no cover
     sync_playwright = None
 
+try:
+    import numpy as np
+except Exception: # pragma: no cover
+    np = None
+
 # === MCP (FastMCP) ===
 from mcp.server.fastmcp import FastMCP
 from mcp.server.fastmcp import Context # para tipado en caso de usar lifespan
 from mcp.server.session import ServerSession
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+# ------------------------------------------------------------
+# Logging estructurado
+# ------------------------------------------------------------
+
+# Los registros se encolan y un hilo aparte los escribe en stderr: con stdio el
+# event loop nunca espera por la E/S de los logs. Debajo del nivel configurado
+# un `log.debug(...)` no formatea nada.
+LOG_LEVEL = os.environ.get("WORDLE_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("WORDLE_LOG_FORMAT", "text") # "text" o "json"
+LOG_SAMPLE = float(os.environ.get("WORDLE_LOG_SAMPLE", "1.0")) # fraccion de llamadas con logs DEBUG/INFO
+
+log = logging.getLogger("wordle")
+
+# Campos de la llamada en curso (session, tool, timings, sampled); se copian al executor con el contexto
+_LOG_CONTEXT: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("wordle_log_context", default=None)
+
+class _ContextFilter(logging.Filter):
+    """Agrega los campos de la llamada al registro y aplica el muestreo por llamada.
+
+    Los WARNING y superiores pasan siempre; el resto solo si la llamada salio sorteada.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = _LOG_CONTEXT.get()
+        fields = dict(getattr(record, "fields", None) or {})
+        if ctx is not None:
+            if record.levelno < logging.WARNING and not ctx["sampled"]:
+                return False
+            fields = {"session": ctx["session"], "tool": ctx["tool"], **fields}
+            if ctx["timings"]:
+                fields.setdefault("timings", dict(ctx["timings"]))
+        record.fields = fields
+        return True
+
+class _TextFormatter(logging.Formatter):
+    """`[NIVEL] mensaje clave=valor ...`, como los antiguos prints de depuracion."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = f"[{record.levelname}] {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{k}={json.dumps(v, default=str, ensure_ascii=False)}" for k, v in fields.items())
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+class _JsonFormatter(logging.Formatter):
+    """Una linea JSON por registro: ts, level, msg y los campos estructurados."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "msg": record.getMessage(),
+            **(getattr(record, "fields", None) or {}),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class _StderrHandler(logging.StreamHandler):
+    """Escribe en el `sys.stderr` vigente, para que los scripts que lo redirigen sigan silenciando los logs."""
+
+    def __init__(self) -> None:
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+_LOG_LISTENER: Optional[logging.handlers.QueueListener] = None
+
+def _configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, sample: float = LOG_SAMPLE) -> None:
+    """(Re)configura el logger `wordle`: nivel, formato (text/json) y muestreo."""
+    global _LOG_LISTENER, LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE
+    if fmt not in ("text", "json"):
+        raise ValueError(f"formato de log invalido: {fmt} (usa text o json)")
+    LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE = level.upper(), fmt, max(0.0, min(1.0, sample))
+    if _LOG_LISTENER is not None:
+        _LOG_LISTENER.stop()
+    for handler in list(log.handlers):
+        log.removeHandler(handler)
+    stream = _StderrHandler()
+    stream.setFormatter(_JsonFormatter() if fmt == "json" else _TextFormatter())
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(_ContextFilter())
+    _LOG_LISTENER = logging.handlers.QueueListener(queue_handler.queue, stream)
+    _LOG_LISTENER.start()
+    log.addHandler(queue_handler)
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
+
+def _stop_logging() -> None:
+    """Vacia la cola de logs antes de salir."""
+    if _LOG_LISTENER is not None:
+        _LOG_LISTENER.stop()
+
+atexit.register(_stop_logging)
+_configure_logging()
+
+@contextlib.contextmanager
+def _log_context(tool: str, session: Optional[str]):
+    """Campos de log de una llamada a herramienta; al salir registra su duracion (log y, si no esta anidada, metricas)."""
+    outer = _LOG_CONTEXT.get()
+    ctx = {
+        "session": session,
+        "tool": tool,
+        "timings": {},
+        # Una llamada anidada hereda el sorteo para no cortar la traza a la mitad
+        "sampled": outer["sampled"] if outer is not None else LOG_SAMPLE >= 1.0 or random.random() < LOG_SAMPLE,
+    }
+    token = _LOG_CONTEXT.set(ctx)
+    t0 = time.perf_counter()
+    error = False
+    try:
+        yield ctx
+    except BaseException:
+        error = True
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        # Una herramienta llamada desde otra ya cuenta en la de fuera
+        if outer is None:
+            _METRICS.observe_tool(tool, elapsed_ms, error)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s terminada", tool, extra={"fields": {"elapsed_ms": round(elapsed_ms, 2), "error": error}})
+        _LOG_CONTEXT.reset(token)
+
+@contextlib.contextmanager
+def _log_stage(name: str):
+    """Acumula en `timings` de la llamada en curso los ms de la etapa `name` y los registra en las metricas."""
+    ctx = _LOG_CONTEXT.get()
+    if ctx is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        timings = ctx["timings"]
+        timings[name] = round(timings.get(name, 0.0) + elapsed_ms, 3)
+        _METRICS.observe_stage(name, elapsed_ms)
+
+def _logged(fn):
+    """Ejecuta la herramienta `fn` dentro de su `_log_context` (tool = nombre, session = argumento)."""
+    param = inspect.signature(fn).parameters.get("session")
+    default = param.default if param is not None else None
+
+    def session_of(args, kwargs):
+        if param is None:
+            return None
+        return kwargs.get("session", args[0] if args else default)
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with _log_context(fn.__name__, session_of(args, kwargs)):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _log_context(fn.__name__, session_of(args, kwargs)):
+            return fn(*args, **kwargs)
+    return wrapper
+
+# ------------------------------------------------------------
+# Metricas
+# ------------------------------------------------------------
+
+# Limites de los histogramas de latencia, en ms (Prometheus los recibe en segundos)
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class LatencyHistogram:
+    """Histograma acumulativo de latencias con cubos fijos (no guarda muestras)."""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1) # el ultimo cubo es +Inf
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Cuantil estimado interpolando dentro del cubo (como histogram_quantile), acotado por el maximo visto."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank and i < len(LATENCY_BUCKETS_MS):
+                lo = LATENCY_BUCKETS_MS[i - 1] if i else 0.0
+                return min(lo + (LATENCY_BUCKETS_MS[i] - lo) * (rank - seen) / c, self.max_ms)
+            seen += c
+        return self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": _round_opt(self.quantile(0.50)),
+            "p95_ms": _round_opt(self.quantile(0.95)),
+            "p99_ms": _round_opt(self.quantile(0.99)),
+            "max_ms": round(self.max_ms, 3) if self.count else None,
+        }
+
+def _round_opt(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+class MetricsRegistry:
+    """Llamadas, errores y latencias por herramienta y por etapa, en memoria del proceso."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self.requests: Counter = Counter()
+            self.errors: Counter = Counter()
+            self.latency: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+
+    def observe_tool(self, tool: str, ms: float, error: bool = False) -> None:
+        with self._lock:
+            self.requests[tool] += 1
+            if error:
+                self.errors[tool] += 1
+            self.latency["tool", tool].observe(ms)
+
+    def observe_stage(self, stage: str, ms: float) -> None:
+        with self._lock:
+            self.latency["stage", stage].observe(ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            uptime = max(time.time() - self.started, 1e-9)
+            tools = {
+                tool: {
+                    "requests": self.requests[tool],
+                    "errors": self.errors[tool],
+                    "throughput_per_s": round(self.requests[tool] / uptime, 4),
+                    "latency": self.latency["tool", tool].summary(),
+                }
+                for tool in sorted(self.requests)
+            }
+            stages = {name: h.summary() for (kind, name), h in sorted(self.latency.items()) if kind == "stage"}
+        return {"uptime_s": round(uptime, 1), "tools": tools, "stages": stages}
+
+    def prometheus(self) -> str:
+        """Exposicion en formato de texto de Prometheus (version 0.0.4)."""
+        lines = [
+            "# HELP wordle_tool_requests_total Llamadas por herramienta.",
+            "# TYPE wordle_tool_requests_total counter",
+        ]
+        with self._lock:
+            lines += [f'wordle_tool_requests_total{{tool="{t}"}} {n}' for t, n in sorted(self.requests.items())]
+            lines += [
+                "# HELP wordle_tool_errors_total Llamadas que terminaron con error.",
+                "# TYPE wordle_tool_errors_total counter",
+            ]
+            lines += [f'wordle_tool_errors_total{{tool="{t}"}} {self.errors[t]}' for t in sorted(self.requests)]
+            for kind, help_text in (("tool", "Latencia por herramienta."), ("stage", "Latencia por etapa del solver.")):
+                metric = f"wordle_{kind}_latency_seconds"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for (k, name), h in sorted(self.latency.items()):
+                    if k != kind:
+                        continue
+                    cumulative = 0
+                    for le, c in zip((*LATENCY_BUCKETS_MS, None), h.counts):
+                        cumulative += c
+                        bound = "+Inf" if le is None else repr(le / 1000)
+                        lines.append(f'{metric}_bucket{{{kind}="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{{kind}="{name}"}} {h.total_ms / 1000:.6f}')
+                    lines.append(f'{metric}_count{{{kind}="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+_METRICS = MetricsRegistry()
 
 # ------------------------------------------------------------
 # Utilidades core Wordle
@@ -48,57 +368,869 @@ def _norm(word: str) -> str:
     w = re.sub(r"[^a-z]", "", w)
     return w if len(w) == 5 else ""
 
+class ConstraintIndex:
+    """Listas de postings (bitsets) de un diccionario para filtrar por restricciones.
+
+    `at[p][c]` marca las palabras con la letra c en la posicion p y `at_least[c][k]`
+    las que contienen la letra c al menos k veces. Un par (guess, feedback) se traduce
+    en restricciones posicionales y de conteo minimo/maximo por letra, y filtrar es
+    intersectar unos pocos bitsets en lugar de recalcular `_pattern` por candidata.
+    """
+
+    def __init__(self, words: Sequence[str]) -> None:
+        n = len(words)
+        nbytes = (n + 7) // 8
+        at = [[bytearray(nbytes) for _ in range(26)] for _ in range(5)]
+        exact = [[bytearray(nbytes) for _ in range(6)] for _ in range(26)]
+        for i, w in enumerate(words):
+            byte, bit = i >> 3, 1 << (i & 7)
+            for p, ch in enumerate(w):
+                at[p][ord(ch) - 97][byte] |= bit
+            for ch in set(w):
+                exact[ord(ch) - 97][w.count(ch)][byte] |= bit
+        self.full = (1 << n) - 1
+        self.at = [[int.from_bytes(b, "little") for b in row] for row in at]
+        self.at_least: List[List[int]] = []
+        for c in range(26):
+            row = [0] * 7
+            for k in range(5, 0, -1):
+                row[k] = row[k + 1] | int.from_bytes(exact[c][k], "little")
+            row[0] = self.full
+            self.at_least.append(row)
+
+    @classmethod
+    def from_arrays(cls, letters, counts) -> "ConstraintIndex":
+        """Construye el indice con NumPy desde letras (N,5) 0..25 y conteos por letra (N,26)."""
+        def bits(column) -> int:
+            return int.from_bytes(np.packbits(column, bitorder="little").tobytes(), "little")
+
+        self = cls.__new__(cls)
+        self.full = (1 << len(letters)) - 1
+        self.at = [[bits(letters[:, p] == c) for c in range(26)] for p in range(5)]
+        self.at_least = [
+            [self.full] + [bits(counts[:, c] >= k) for k in range(1, 6)] + [0] for c in range(26)
+        ]
+        return self
+
+    def mask_for(self, guess: str, feedback: str) -> int:
+        """Bitset de las palabras que producirian `feedback` (G/Y/K) al jugar `guess`.
+
+        Misma semantica que `_pattern`: entre las posiciones no verdes de una letra los
+        amarillos se asignan de izquierda a derecha, asi que un gris seguido de un
+        amarillo de la misma letra es imposible; un gris fija el conteo exacto.
+        """
+        m = self.full
+        min_count: Dict[int, int] = {}
+        capped = set()
+        for i in range(5):
+            c = ord(guess[i]) - 97
+            f = feedback[i]
+            if f == "G":
+                m &= self.at[i][c]
+                min_count[c] = min_count.get(c, 0) + 1
+                continue
+            m &= ~self.at[i][c]
+            if f == "Y":
+                if c in capped:
+                    return 0
+                min_count[c] = min_count.get(c, 0) + 1
+            else:
+                capped.add(c)
+        for c, k in min_count.items():
+            m &= self.at_least[c][k]
+            if c in capped:
+                m &= ~self.at_least[c][k + 1]
+        for c in capped:
+            if c not in min_count:
+                m &= ~self.at_least[c][1]
+        return m
+
+@dataclass(frozen=True)
+class Dictionary:
+    """Diccionario inmutable de un idioma, cargado una vez por proceso y compartido por las sesiones."""
+    language: str
+    words: Tuple[str, ...]
+    index: Mapping[str, int] # palabra -> posicion en `words`
+    digest: str # huella del contenido (version del diccionario)
+    constraints: ConstraintIndex = field(repr=False, compare=False)
+
+# bits activos de cada byte, para recorrer un bitset sin desplazar el entero completo
+_BYTE_BITS = tuple(tuple(b for b in range(8) if v >> b & 1) for v in range(256))
+
+class CandidateSet:
+    """Subconjunto inmutable de un `Dictionary` representado como bitset (un int de Python).
+
+    El bit i corresponde a `dictionary.words[i]`: la pertenencia se resuelve por indice,
+    la interseccion es un `&` y el conteo un popcount. Una sesion guarda unos pocos KB
+    en lugar de listas con miles de cadenas.
+    """
+
+    __slots__ = ("dictionary", "mask", "_count")
+
+    _FULL: Dict[Tuple[str, str], "CandidateSet"] = {} # conjunto completo compartido por diccionario
+
+    def __init__(self, dictionary: Dictionary, mask: int, count: Optional[int] = None) -> None:
+        self.dictionary = dictionary
+        self.mask = mask
+        self._count = count
+
+    @classmethod
+    def full(cls, dictionary: Dictionary) -> "CandidateSet":
+        """Conjunto con todo el diccionario (una sola instancia compartida por diccionario)."""
+        key = (dictionary.language, dictionary.digest)
+        cs = cls._FULL.get(key)
+        if cs is None or cs.dictionary is not dictionary:
+            n = len(dictionary.words)
+            cs = cls._FULL[key] = cls(dictionary, (1 << n) - 1, n)
+        return cs
+
+    def nbytes(self) -> int:
+        """Memoria aproximada propia del conjunto (0 si es el conjunto completo compartido)."""
+        if self._FULL.get((self.dictionary.language, self.dictionary.digest)) is self:
+            return 0
+        return sys.getsizeof(self) + sys.getsizeof(self.mask)
+
+    @classmethod
+    def from_indices(cls, dictionary: Dictionary, indices) -> "CandidateSet":
+        bits = bytearray((len(dictionary.words) + 7) // 8)
+        count = 0
+        for i in indices:
+            bits[i >> 3] |= 1 << (i & 7)
+            count += 1
+        return cls(dictionary, int.from_bytes(bits, "little"), count)
+
+    @classmethod
+    def from_words(cls, dictionary: Dictionary, words: Sequence[str]) -> "CandidateSet":
+        """Conjunto con las `words` que existen en el diccionario (las demas se ignoran)."""
+        index = dictionary.index
+        return cls.from_indices(dictionary, (index[w] for w in words if w in index))
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = self.mask.bit_count()
+        return self._count
+
+    def __contains__(self, word: object) -> bool:
+        i = self.dictionary.index.get(word) if isinstance(word, str) else None
+        return i is not None and (self.mask >> i) & 1 == 1
+
+    def __and__(self, other: "CandidateSet") -> "CandidateSet":
+        return CandidateSet(self.dictionary, self.mask & other.mask)
+
+    def __iter__(self):
+        words = self.dictionary.words
+        return (words[i] for i in self.indices())
+
+    def __repr__(self) -> str:
+        return f"CandidateSet({self.dictionary.language}, {len(self)}/{len(self.dictionary.words)})"
+
+    def indices(self) -> List[int]:
+        """Indices activos en orden del diccionario."""
+        n = len(self.dictionary.words)
+        if len(self) == n:
+            return list(range(n))
+        data = self.mask.to_bytes((n + 7) // 8, "little")
+        out: List[int] = []
+        for byte_i, v in enumerate(data):
+            if v:
+                base = byte_i << 3
+                out.extend(base + b for b in _BYTE_BITS[v])
+        return out
+
+    def fingerprint(self) -> str:
+        """Huella compacta del conjunto (diccionario + bitset), apta como clave de cache."""
+        n = len(self.dictionary.words)
+        h = hashlib.blake2b(self.mask.to_bytes((n + 7) // 8, "little"), digest_size=16)
+        return f"{self.dictionary.digest[:16]}:{h.hexdigest()}"
+
+    def words(self) -> Sequence[str]:
+        """Palabras del conjunto en orden del diccionario (la tupla compartida si esta completo)."""
+        if len(self) == len(self.dictionary.words):
+            return self.dictionary.words
+        words = self.dictionary.words
+        return [words[i] for i in self.indices()]
+
 @dataclass
 class SessionState:
     language: str = "es"
-    candidates: List[str] = field(default_factory=list) # posibles respuestas
-    guess_pool: List[str] = field(default_factory=list) # palabras permitidas para adivinar
+    candidates: Optional[CandidateSet] = None # posibles respuestas
+    guess_pool: Optional[CandidateSet] = None # palabras permitidas para adivinar
     history: List[Tuple[str, str]] = field(default_factory=list) # (guess, feedback)
+    dictionary: Optional[Dictionary] = None
+    # Serializa las mutaciones de esta partida; los lectores toman una instantanea
+    # bajo el lock (CandidateSet es inmutable) y calculan fuera de el.
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
+
+def _session_nbytes(st: SessionState) -> int:
+    """Memoria aproximada de una sesion (sin contar el diccionario compartido)."""
+    size = sys.getsizeof(st) + sys.getsizeof(st.history)
+    for guess, fb in st.history:
+        size += 56 + sys.getsizeof(guess) + sys.getsizeof(fb)
+    for cs in (st.candidates, st.guess_pool):
+        if cs is not None:
+            size += cs.nbytes()
+    return size
+
+class SessionRegistry:
+    """Registro acotado de sesiones con un lock por sesion.
+
+    El lock del registro solo cubre altas, bajas y el orden LRU; las operaciones
+    sobre partidas distintas no compiten entre si. Se desalojan las partidas
+    menos usadas recientemente al superar `max_sessions` o `memory_budget`
+    (bytes aproximados), y las que llevan mas de `idle_ttl` segundos sin uso.
+    Un limite en 0 desactiva esa politica.
+    """
+
+    def __init__(self, max_sessions: int = 0, idle_ttl: float = 0.0, memory_budget: int = 0) -> None:
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        # sesion -> [estado, ultimo acceso (monotonic), bytes estimados]; orden = LRU
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.created = 0
+        self.evicted = {"lru": 0, "ttl": 0, "memory": 0}
+
+    def get_or_create(self, session: str, factory) -> SessionState:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry is not None:
+                entry[1] = now
+                self._sessions.move_to_end(session)
+                self._evict_locked(now)
+                return entry[0]
+        st = factory() # fuera del lock: puede cargar el diccionario
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry is None:
+                nbytes = _session_nbytes(st)
+                entry = self._sessions[session] = [st, now, nbytes]
+                self._bytes += nbytes
+                self.created += 1
+            self._sessions.move_to_end(session)
+            self._evict_locked(now)
+            return entry[0]
+
+    def get(self, session: str) -> Optional[SessionState]:
+        entry = self._sessions.get(session)
+        return entry[0] if entry is not None else None
+
+    def account(self, session: str) -> None:
+        """Recalcula la memoria estimada de `session` tras mutarla y aplica el presupuesto."""
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry is None:
+                return
+            nbytes = _session_nbytes(entry[0])
+            self._bytes += nbytes - entry[2]
+            entry[2] = nbytes
+            self._evict_locked(time.monotonic())
 
-_SESSIONS: Dict[str, SessionState] = {}
-_LOCK = threading.Lock()
+    def pop(self, session: str, default: Optional[SessionState] = None) -> Optional[SessionState]:
+        with self._lock:
+            entry = self._sessions.pop(session, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[2]
+            return entry[0]
+
+    def _evict_locked(self, now: float) -> None:
+        # La sesion mas reciente (la que se esta usando) nunca se desaloja.
+        while len(self._sessions) > 1:
+            session, (_, last, nbytes) = next(iter(self._sessions.items()))
+            if self.idle_ttl and now - last > self.idle_ttl:
+                reason = "ttl"
+            elif self.max_sessions and len(self._sessions) > self.max_sessions:
+                reason = "lru"
+            elif self.memory_budget and self._bytes > self.memory_budget:
+                reason = "memory"
+            else:
+                break
+            del self._sessions[session]
+            self._bytes -= nbytes
+            self.evicted[reason] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            live = len(self._sessions)
+            return {
+                "live": live,
+                "created": self.created,
+                "evicted": dict(self.evicted, total=sum(self.evicted.values())),
+                "approx_bytes": self._bytes,
+                "approx_bytes_per_session": round(self._bytes / live, 1) if live else 0.0,
+                "limits": {
+                    "max_sessions": self.max_sessions,
+                    "idle_ttl_seconds": self.idle_ttl,
+                    "memory_budget_bytes": self.memory_budget,
+                },
+            }
+
+    def __contains__(self, session: object) -> bool:
+        return session in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+MAX_SESSIONS = int(os.environ.get("WORDLE_MAX_SESSIONS", "10000"))
+SESSION_TTL = float(os.environ.get("WORDLE_SESSION_TTL", "86400")) # segundos sin uso
+SESSION_MEMORY_MB = float(os.environ.get("WORDLE_SESSION_MEMORY_MB", "0")) # 0 = sin presupuesto
+
+_SESSIONS = SessionRegistry(MAX_SESSIONS, SESSION_TTL, int(SESSION_MEMORY_MB * 1024 * 1024))
 
 # -------------------------
 # Wordlist / Diccionarios
 # -------------------------
 
 WORDLIST_FILE = os.path.join(os.path.dirname(__file__), "word.txt")
+CACHE_DIR = os.environ.get("WORDLE_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+COMPILED_DICT_FILE = os.environ.get("WORDLE_COMPILED_DICT") or os.path.join(CACHE_DIR, "words-es.wdic")
 
-def _make_wordlist(lang: str = "es", max_words: int = 30000) -> List[str]:
-    """Carga el listado de palabras desde word.txt"""
+def _parse_wordlist(path: str) -> List[str]:
+    """Lee y normaliza un archivo de palabras (una por linea), sin duplicados y en orden."""
     out: List[str] = []
     seen = set()
-    try:
-        with open(WORDLIST_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                w = _norm(line)
-                if w and ALPHA_RE.match(w) and w not in seen:
-                    seen.add(w)
-                    out.append(w)
-    except FileNotFoundError:
-        # Fallback con palabras básicas si no existe el archivo
-        basic_words = [
-            "carro", "perro", "gatos", "casas", "mundo", "tiempo", "lugar", "poner",
-            "hacer", "decir", "llegar", "pasar", "quedar", "salir", "venir", "poder",
-            "tener", "estar", "haber", "deber", "querer", "saber", "pensar", "creer",
-            "llevar", "dejar", "vivir", "morir", "nacer", "crecer", "subir", "bajar"
-        ]
-        out = [w for w in basic_words if _norm(w) and len(_norm(w)) == 5]
-        print(f"[WARNING] No se encontró {WORDLIST_FILE}, usando diccionario básico de {len(out)} palabras", file=sys.stderr)
-    
-    return out[:max_words]
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            w = _norm(line)
+            if w and ALPHA_RE.match(w) and w not in seen:
+                seen.add(w)
+                out.append(w)
+    return out
 
-def _ensure_session(session: str, language: str = "es") -> SessionState:
-    with _LOCK:
-        if session not in _SESSIONS:
-            words = _make_wordlist(language)
-            _SESSIONS[session] = SessionState(
-                language=language,
-                candidates=words.copy(),
-                guess_pool=words.copy(),
-                history=[],
+def _file_sha1(path: str) -> bytes:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.digest()
+
+class CompiledDictionary:
+    """Diccionario empaquetado por tools/compile_dictionary.py y mapeado con mmap, sin copias.
+
+    Cabecera `<8sII20s20s` (magic, #palabras, flags, sha1 del archivo fuente, huella de las
+    palabras) seguida de secciones de registros fijos alineadas a 8 bytes: letras (5 bytes
+    ASCII), mascara de letras presentes (uint32), conteo por letra (26 x uint8) y frecuencia
+    (uint32, saturada). El mmap es de solo lectura, asi que los procesos comparten las paginas.
+    """
+
+    MAGIC = b"WDIC\x01\x00\x00\x00"
+    _HEADER = struct.Struct("<8sII20s20s")
+    FLAG_FREQ = 1
+    # seccion -> bytes por palabra
+    _SECTIONS = (("letters", 5), ("masks", 4), ("counts", 26), ("freqs", 4))
+
+    def __init__(self, mm, n: int, flags: int, source_sha1: bytes, digest: bytes) -> None:
+        self._mm = mm
+        self.n = n
+        self.flags = flags
+        self.source_sha1 = source_sha1
+        self.digest = digest.hex()
+        self.offsets = self._layout(n)
+
+    @classmethod
+    def _layout(cls, n: int) -> Dict[str, int]:
+        offsets = {}
+        off = cls._HEADER.size
+        for name, width in cls._SECTIONS:
+            off = (off + 7) & ~7
+            offsets[name] = off
+            off += n * width
+        offsets["end"] = off
+        return offsets
+
+    @classmethod
+    def write(
+        cls,
+        path: str,
+        words: Sequence[str],
+        source_sha1: bytes,
+        freqs: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        """Escribe el artefacto binario de forma atomica."""
+        n = len(words)
+        offsets = cls._layout(n)
+        buf = bytearray(offsets["end"])
+        flags = cls.FLAG_FREQ if freqs is not None else 0
+        cls._HEADER.pack_into(buf, 0, cls.MAGIC, n, flags, source_sha1, bytes.fromhex(_words_digest(words)))
+        for i, w in enumerate(words):
+            buf[offsets["letters"] + 5 * i:offsets["letters"] + 5 * i + 5] = w.encode("ascii")
+            mask = 0
+            base = offsets["counts"] + 26 * i
+            for ch in w:
+                c = ord(ch) - 97
+                mask |= 1 << c
+                buf[base + c] += 1
+            struct.pack_into("<I", buf, offsets["masks"] + 4 * i, mask)
+            if freqs is not None:
+                struct.pack_into("<I", buf, offsets["freqs"] + 4 * i, min(freqs.get(w, 0), 0xFFFFFFFF))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(buf)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, source_sha1: Optional[bytes] = None) -> Optional["CompiledDictionary"]:
+        """Mapea el artefacto; None si falta, esta corrupto o no corresponde a `source_sha1`."""
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mm) < cls._HEADER.size:
+            return None
+        magic, n, flags, src, digest = cls._HEADER.unpack_from(mm, 0)
+        if (
+            magic != cls.MAGIC
+            or len(mm) != cls._layout(n)["end"]
+            or (source_sha1 is not None and src != source_sha1)
+        ):
+            return None
+        return cls(mm, n, flags, src, digest)
+
+    def words(self, limit: Optional[int] = None) -> List[str]:
+        n = self.n if limit is None else min(limit, self.n)
+        off = self.offsets["letters"]
+        raw = self._mm[off:off + 5 * n].decode("ascii")
+        return [raw[i:i + 5] for i in range(0, 5 * n, 5)]
+
+    def letter_mask(self, i: int) -> int:
+        return struct.unpack_from("<I", self._mm, self.offsets["masks"] + 4 * i)[0]
+
+    def letter_counts(self, i: int) -> bytes:
+        off = self.offsets["counts"] + 26 * i
+        return self._mm[off:off + 26]
+
+    def frequency(self, i: int) -> Optional[int]:
+        if not self.flags & self.FLAG_FREQ:
+            return None
+        return struct.unpack_from("<I", self._mm, self.offsets["freqs"] + 4 * i)[0]
+
+    def array(self, section: str, limit: Optional[int] = None):
+        """Vista NumPy (sin copia) de una seccion: letters (N,5), masks (N,), counts (N,26), freqs (N,)."""
+        n = self.n if limit is None else min(limit, self.n)
+        width = dict(self._SECTIONS)[section]
+        if section in ("masks", "freqs"):
+            return np.frombuffer(self._mm, dtype="<u4", count=n, offset=self.offsets[section])
+        return np.frombuffer(self._mm, dtype=np.uint8, count=n * width, offset=self.offsets[section]).reshape(n, width)
+
+    def constraint_index(self, limit: Optional[int] = None) -> Optional["ConstraintIndex"]:
+        """ConstraintIndex de las primeras `limit` palabras a partir de las secciones (requiere NumPy)."""
+        if np is None:
+            return None
+        return ConstraintIndex.from_arrays(self.array("letters", limit) - 97, self.array("counts", limit))
+
+_COMPILED: Dict[str, Optional[CompiledDictionary]] = {}
+
+def _get_compiled_dictionary(path: Optional[str] = None, source: Optional[str] = None) -> Optional[CompiledDictionary]:
+    """Artefacto compilado vigente (coincide con el sha1 de `source`) o None; se mapea una vez."""
+    path = path or COMPILED_DICT_FILE
+    source = source or WORDLIST_FILE
+    if path not in _COMPILED:
+        try:
+            source_sha1 = _file_sha1(source)
+        except OSError:
+            source_sha1 = None
+        compiled = CompiledDictionary.load(path, source_sha1)
+        if compiled is None and os.path.exists(path):
+            log.info("Diccionario compilado %s desactualizado o invalido; se usa %s", path, source)
+        _COMPILED[path] = compiled
+    return _COMPILED[path]
+
+@dataclass(frozen=True)
+class LanguageSource:
+    """De donde salen las palabras de un idioma, en orden de preferencia.
+
+    `compiled` (binario de tools/compile_dictionary.py, valido solo si coincide con `path`),
+    `path` (texto, una palabra por linea), `wordfreq` (codigo de idioma, por frecuencia)
+    y `fallback` como ultimo recurso.
+    """
+
+    path: Optional[str] = None
+    compiled: Optional[str] = None
+    wordfreq: Optional[str] = None
+    fallback: Tuple[str, ...] = ()
+    max_words: int = 30000
+
+# Fallback con palabras básicas si no existe el archivo
+_BASIC_WORDS_ES = (
+    "carro", "perro", "gatos", "casas", "mundo", "tiempo", "lugar", "poner",
+    "hacer", "decir", "llegar", "pasar", "quedar", "salir", "venir", "poder",
+    "tener", "estar", "haber", "deber", "querer", "saber", "pensar", "creer",
+    "llevar", "dejar", "vivir", "morir", "nacer", "crecer", "subir", "bajar",
+)
+
+WORDFREQ_SCAN = 500_000  # palabras de wordfreq que se recorren buscando las de 5 letras
+
+# Idiomas conocidos; cualquier otro se resuelve con WORDLE_WORDLIST_<IDIOMA> o wordfreq.
+LANGUAGES: Dict[str, LanguageSource] = {
+    "es": LanguageSource(path=WORDLIST_FILE, compiled=COMPILED_DICT_FILE, fallback=_BASIC_WORDS_ES),
+    "en": LanguageSource(path=os.environ.get("WORDLE_WORDLIST_EN"), wordfreq="en"),
+}
+
+def _language_source(lang: str) -> LanguageSource:
+    """Origen de palabras de `lang`; ValueError si el idioma no tiene ninguno."""
+    src = LANGUAGES.get(lang)
+    if src is not None:
+        return src
+    path = os.environ.get(f"WORDLE_WORDLIST_{lang.upper().replace('-', '_')}")
+    if path or (available_languages is not None and lang in available_languages()):
+        return LanguageSource(path=path, wordfreq=lang)
+    raise ValueError(f"idioma no soportado: {lang!r}")
+
+def _wordfreq_words(code: str) -> List[str]:
+    """Palabras de 5 letras de wordfreq, normalizadas y de mas a menos frecuentes."""
+    out: List[str] = []
+    seen = set()
+    for raw in top_n_list(code, WORDFREQ_SCAN):
+        w = _norm(raw)
+        if w and ALPHA_RE.match(w) and w not in seen:
+            seen.add(w)
+            out.append(w)
+    return out
+
+def _make_wordlist(lang: str = "es", max_words: Optional[int] = None) -> List[str]:
+    """Carga el listado de palabras de `lang`: binario compilado, archivo de texto, wordfreq o fallback"""
+    src = _language_source(lang)
+    limit = src.max_words if max_words is None else max_words
+    if src.compiled:
+        compiled = _get_compiled_dictionary(src.compiled, src.path)
+        if compiled is not None:
+            return compiled.words(limit)
+    if src.path:
+        try:
+            return _parse_wordlist(src.path)[:limit]
+        except FileNotFoundError:
+            log.warning("No se encontró %s", src.path)
+    if src.wordfreq and top_n_list is not None:
+        out = _wordfreq_words(src.wordfreq)
+        if out:
+            return out[:limit]
+    out = [w for w in src.fallback if _norm(w) and len(_norm(w)) == 5]
+    if not out:
+        raise ValueError(f"sin palabras para el idioma {lang!r}")
+    log.warning("Usando diccionario básico de %d palabras para %r", len(out), lang)
+    return out[:limit]
+
+_DICTIONARIES: Dict[str, Dictionary] = {}
+_DICTIONARIES_LOCK = threading.Lock()
+
+def _build_dictionary(lang: str, words: Sequence[str], constraints: Optional[ConstraintIndex] = None) -> Dictionary:
+    """Construye un Dictionary (con sus indices) a partir de palabras ya normalizadas."""
+    words = tuple(words)
+    return Dictionary(
+        language=lang,
+        words=words,
+        index=MappingProxyType({w: i for i, w in enumerate(words)}),
+        digest=_words_digest(words),
+        constraints=constraints or ConstraintIndex(words),
+    )
+
+def _get_dictionary(lang: str = "es") -> Dictionary:
+    """Devuelve el diccionario compartido de `lang`, cargandolo y construyendo sus indices solo la primera vez."""
+    lang = (lang or "es").strip().lower()
+    d = _DICTIONARIES.get(lang)
+    if d is not None:
+        return d
+    with _DICTIONARIES_LOCK:
+        d = _DICTIONARIES.get(lang)
+        if d is None:
+            t0 = time.perf_counter()
+            src = _language_source(lang)
+            words = _make_wordlist(lang)
+            compiled = _get_compiled_dictionary(src.compiled, src.path) if src.compiled else None
+            # Con el binario vigente los indices salen de sus secciones en lugar de recorrer las palabras
+            constraints = compiled.constraint_index(len(words)) if compiled is not None else None
+            d = _build_dictionary(lang, words, constraints)
+            _DICTIONARIES[lang] = d
+            log.info(
+                "Diccionario '%s' cargado: %d palabras", lang, len(words),
+                extra={"fields": {"elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}},
             )
-    return _SESSIONS[session]
+    return d
+
+def _new_session_state(language: str = "es") -> SessionState:
+    """Estado inicial de una partida: referencias al diccionario compartido, sin copias."""
+    d = _get_dictionary(language)
+    full = CandidateSet.full(d)
+    return SessionState(
+        language=d.language,
+        candidates=full,
+        guess_pool=full,
+        history=[],
+        dictionary=d,
+    )
+
+def _ensure_session(session: str, language: str = "es") -> SessionState:
+    return _SESSIONS.get_or_create(session, lambda: _restore_session(session) or _new_session_state(language))
+
+def _replay_history(dictionary: Dictionary, history: Sequence[Tuple[str, str]]) -> CandidateSet:
+    """Candidatas que resultan de aplicar `history` sobre el diccionario completo."""
+    cs = CandidateSet.full(dictionary)
+    with _scoring_dictionary(dictionary):
+        for guess, fb in history:
+            cs = _filter_candidates(cs, guess, fb)
+    return cs
+
+# -------------------------
+# Modo sin estado (historial o token firmado en la peticion)
+# -------------------------
+
+STATE_SECRET = os.environ.get("WORDLE_STATE_SECRET", "")
+# Sin secreto configurado se usa uno aleatorio: los tokens solo valen en este proceso.
+# Detras de un balanceador todas las replicas deben compartir WORDLE_STATE_SECRET.
+_STATE_KEY = STATE_SECRET.encode() if STATE_SECRET else secrets.token_bytes(32)
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _encode_state_token(language: str, dictionary: Dictionary, history: Sequence[Tuple[str, str]]) -> str:
+    """Token compacto y firmado (HMAC-SHA256) con idioma, version del diccionario e historial."""
+    payload = json.dumps(
+        {"l": language, "v": dictionary.digest[:16], "h": ",".join(f"{g}{fb}" for g, fb in history)},
+        separators=(",", ":"),
+    ).encode()
+    sig = hmac.new(_STATE_KEY, payload, hashlib.sha256).digest()[:16]
+    return f"{_b64(payload)}.{_b64(sig)}"
+
+def _decode_state_token(token: str) -> Tuple[str, str, List[Tuple[str, str]]]:
+    """Devuelve (idioma, version, historial) de un token valido; ValueError si no lo es."""
+    try:
+        payload_b64, sig_b64 = token.split(".", 1)
+        payload = _unb64(payload_b64)
+        sig = _unb64(sig_b64)
+    except (ValueError, binascii.Error):
+        raise ValueError("state_token invalido") from None
+    expected = hmac.new(_STATE_KEY, payload, hashlib.sha256).digest()[:16]
+    if not hmac.compare_digest(sig, expected):
+        raise ValueError("state_token invalido: firma incorrecta")
+    data = json.loads(payload)
+    moves = [m for m in data.get("h", "").split(",") if m]
+    return data["l"], data["v"], [(m[:5], m[5:]) for m in moves]
+
+def _coerce_history(history: Sequence[Sequence[str]], name: str = "history") -> List[Tuple[str, str]]:
+    out: List[Tuple[str, str]] = []
+    for row in history:
+        if len(row) != 2:
+            raise ValueError(f"{name} invalido: usa [[guess, feedback], ...]")
+        g = _norm(row[0])
+        if not ALPHA_RE.match(g):
+            raise ValueError(f"guess invalido en {name}: {row[0]!r}")
+        out.append((g, _coerce_feedback(row[1])))
+    return out
+
+def _stateless_session(
+    language: str,
+    history: Optional[Sequence[Sequence[str]]],
+    state_token: Optional[str],
+) -> SessionState:
+    """Estado efimero derivado del historial o del token; no se registra ni se persiste."""
+    if state_token:
+        language, version, moves = _decode_state_token(state_token)
+    else:
+        moves = _coerce_history(history or [])
+        version = None
+    st = _new_session_state(language)
+    if version is not None and not st.dictionary.digest.startswith(version):
+        raise ValueError("state_token generado con otra version del diccionario")
+    st.history = moves
+    st.candidates = _replay_history(st.dictionary, moves)
+    return st
+
+def _resolve_session(
+    session: str,
+    history: Optional[Sequence[Sequence[str]]] = None,
+    state_token: Optional[str] = None,
+    language: str = "es",
+) -> Tuple[SessionState, bool]:
+    """(estado, es_sin_estado): efimero si llega `history` o `state_token`, si no la sesion registrada."""
+    if history is not None or state_token:
+        return _stateless_session(language, history, state_token), True
+    return _ensure_session(session), False
+
+# -------------------------
+# Persistencia de sesiones
+# -------------------------
+
+class SessionBackend:
+    """Backend de persistencia de sesiones; esta implementacion base no guarda nada.
+
+    Solo se persiste el estado compacto (idioma, version del diccionario e
+    historial); las candidatas se reconstruyen al volver a tocar la sesion.
+    """
+
+    def load(self, session: str) -> Optional[dict]:
+        return None
+
+    def save(self, session: str, language: str, dictionary_version: str, history: Sequence[Tuple[str, str]]) -> None:
+        pass
+
+    def delete(self, session: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sesiones en una base SQLite local con escritura diferida (write-behind).
+
+    `save` solo deja el ultimo estado de la sesion en memoria; un hilo de fondo
+    agrupa los pendientes y los escribe en una unica transaccion cada
+    `flush_interval` segundos (o antes si se acumulan `batch_size`), de modo que
+    `apply_feedback` no espera al disco.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session TEXT PRIMARY KEY,
+            language TEXT NOT NULL,
+            dictionary_version TEXT NOT NULL,
+            history TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5, batch_size: int = 500) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._read = sqlite3.connect(path, check_same_thread=False)
+        self._read.execute("PRAGMA journal_mode=WAL")
+        self._read.execute(self._SCHEMA)
+        self._read.commit()
+        self._read_lock = threading.Lock()
+        # sesion -> fila pendiente (None = borrar); el ultimo estado gana
+        self._pending: Dict[str, Optional[tuple]] = {}
+        # lote que el escritor esta confirmando: ya no es pendiente ni esta en disco
+        self._inflight: Dict[str, Optional[tuple]] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="wordle-sessions-db", daemon=True)
+        self._writer.start()
+
+    def load(self, session: str) -> Optional[dict]:
+        with self._cond:
+            for queued in (self._pending, self._inflight):
+                if session in queued:
+                    row = queued[session]
+                    return None if row is None else self._row_to_dict(row)
+        with self._read_lock:
+            row = self._read.execute(
+                "SELECT session, language, dictionary_version, history, updated_at FROM sessions WHERE session = ?",
+                (session,),
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    @staticmethod
+    def _row_to_dict(row: tuple) -> dict:
+        return {
+            "session": row[0],
+            "language": row[1],
+            "dictionary_version": row[2],
+            "history": [tuple(h) for h in json.loads(row[3])],
+        }
+
+    def save(self, session: str, language: str, dictionary_version: str, history: Sequence[Tuple[str, str]]) -> None:
+        row = (session, language, dictionary_version, json.dumps([list(h) for h in history]), time.time())
+        self._enqueue(session, row)
+
+    def delete(self, session: str) -> None:
+        self._enqueue(session, None)
+
+    def _enqueue(self, session: str, row: Optional[tuple]) -> None:
+        with self._cond:
+            self._pending[session] = row
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _write_loop(self) -> None:
+        conn = sqlite3.connect(self.path)
+        try:
+            while True:
+                with self._cond:
+                    if not self._pending and not self._closed:
+                        self._cond.wait(self.flush_interval)
+                    batch, self._pending = self._pending, {}
+                    self._inflight = batch
+                    closed = self._closed
+                if batch:
+                    self._write_batch(conn, batch)
+                    with self._cond:
+                        self._inflight = {}
+                        self._cond.notify_all()
+                if closed and not batch:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: "sqlite3.Connection", batch: Dict[str, Optional[tuple]]) -> None:
+        upserts = [row for row in batch.values() if row is not None]
+        deletes = [(session,) for session, row in batch.items() if row is None]
+        try:
+            with conn:
+                if upserts:
+                    conn.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)", upserts)
+                if deletes:
+                    conn.executemany("DELETE FROM sessions WHERE session = ?", deletes)
+        except sqlite3.Error as e:
+            log.warning("No se pudieron persistir %d sesiones: %s", len(batch), e)
+
+    def flush(self) -> None:
+        """Bloquea hasta que lo pendiente quede escrito."""
+        with self._cond:
+            self._cond.notify()
+            while (self._pending or self._inflight) and self._writer.is_alive():
+                self._cond.wait(self.flush_interval)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+        with self._read_lock:
+            self._read.close()
+
+SESSIONS_DB = os.environ.get("WORDLE_SESSIONS_DB", "")
+_SESSION_BACKEND: SessionBackend = SessionBackend()
+
+def _configure_session_backend(path: str) -> SessionBackend:
+    """Activa la persistencia SQLite en `path` (vacio = sin persistencia)."""
+    global _SESSION_BACKEND
+    _SESSION_BACKEND.close()
+    _SESSION_BACKEND = SQLiteSessionBackend(path) if path else SessionBackend()
+    return _SESSION_BACKEND
+
+def _persist_session(session: str, st: SessionState) -> None:
+    """Encola el estado compacto de la sesion; llamar con `st.lock` tomado."""
+    if st.dictionary is not None:
+        _SESSION_BACKEND.save(session, st.language, st.dictionary.digest, list(st.history))
+
+def _restore_session(session: str) -> Optional[SessionState]:
+    """Reconstruye una sesion persistida reaplicando su historial (None si no existe)."""
+    rec = _SESSION_BACKEND.load(session)
+    if rec is None:
+        return None
+    st = _new_session_state(rec["language"])
+    if st.dictionary.digest != rec["dictionary_version"]:
+        log.warning("La sesion %s se guardo con otra version del diccionario; se reaplica su historial", session)
+    st.history = list(rec["history"])
+    st.candidates = _replay_history(st.dictionary, st.history)
+    return st
+
+if SESSIONS_DB:
+    _configure_session_backend(SESSIONS_DB)
+atexit.register(lambda: _SESSION_BACKEND.close())
 
 # -------------------------
 # Motor de patrones y filtrado
@@ -148,176 +1280,1646 @@ def _coerce_feedback(s: str) -> str:
         return cand
     raise ValueError("feedback invalido: usa G/Y/K o 🟩/🟨/⬛ (5 caracteres)")
 
-def _filter_by_feedback(words: List[str], guess: str, feedback: str) -> List[str]:
+FILTER_MODE = os.environ.get("WORDLE_FILTER_MODE", "index") # "index" (ConstraintIndex) o "pattern"
+
+def _filter_candidates(candidates: CandidateSet, guess: str, feedback: str) -> CandidateSet:
+    """Como `_filter_by_feedback`, pero sobre el bitset de la sesion."""
+    fb = _coerce_feedback(feedback)
+    d = candidates.dictionary
+    if FILTER_MODE == "index":
+        return candidates & CandidateSet(d, d.constraints.mask_for(guess, fb))
+    kept = _filter_by_feedback(candidates.words(), guess, fb)
+    return CandidateSet.from_words(d, kept)
+
+def _filter_by_feedback(words: Sequence[str], guess: str, feedback: str) -> List[str]:
     """Filtra manteniendo unicamente aquellas respuestas que producirian `feedback`
     al evaluar `guess` contra la respuesta real. Esto maneja repeticiones correctamente.
     """
     fb = _coerce_feedback(feedback)
+    pm = _get_pattern_matrix()
+    if pm is not None:
+        codes = pm.codes(guess, words)
+        if codes is not None:
+            target = _pattern_to_code(fb)
+            return [ans for ans, c in zip(words, codes) if c == target]
     out: List[str] = []
     for ans in words:
         if _pattern(guess, ans) == fb:
             out.append(ans)
     return out
 
-# -------------------------
-# Funciones de entropía y sugerencias
-# -------------------------
+# -------------------------
+# Matriz de patrones precomputada (guess x answer)
+# -------------------------
+
+# Cada patron G/Y/K se codifica en base 3 (K=0, Y=1, G=2; posicion i pesa 3**i),
+# de modo que cabe en un uint8 (0..242).
+N_PATTERNS = 243
+_POW3 = (1, 3, 9, 27, 81)
+_PATTERN_DIGIT = {"K": 0, "Y": 1, "G": 2}
+_DIGIT_PATTERN = "KYG"
+ALL_GREEN = 242  # "GGGGG"
+
+def _pattern_to_code(pattern: str) -> int:
+    """Convierte un patron G/Y/K en su codigo base 3."""
+    code = 0
+    for i, ch in enumerate(pattern):
+        code += _PATTERN_DIGIT[ch] * _POW3[i]
+    return code
+
+def _code_to_pattern(code: int) -> str:
+    """Convierte un codigo base 3 en su patron G/Y/K."""
+    out = []
+    for _ in range(5):
+        code, d = divmod(code, 3)
+        out.append(_DIGIT_PATTERN[d])
+    return "".join(out)
+
+def _pattern_code(guess: str, answer: str) -> int:
+    return _pattern_to_code(_pattern(guess, answer))
+
+def _words_digest(words: Sequence[str]) -> str:
+    """Huella (sha1) de una lista de palabras; identifica un diccionario."""
+    h = hashlib.sha1()
+    for w in words:
+        h.update(w.encode("ascii"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+def _encode_words(words: Sequence[str]):
+    """Codifica palabras como matriz (N, 5) uint8 con letras 0..25 (requiere NumPy)."""
+    if not words:
+        return np.zeros((0, 5), dtype=np.uint8)
+    buf = np.frombuffer("".join(words).encode("ascii"), dtype=np.uint8)
+    return (buf.reshape(len(words), 5) - ord("a")).astype(np.uint8)
+
+def _pattern_codes_np(guesses, answers):
+    """Codigos de patron para cada par (guess, answer) en bloque.
+
+    `guesses` (B, 5) y `answers` (M, 5) vienen de `_encode_words`; devuelve (B, M) uint8.
+    Replica exactamente `_pattern`: los amarillos se asignan de izquierda a derecha
+    mientras queden letras no verdes disponibles en la respuesta.
+    """
+    green = guesses[:, None, :] == answers[None, :, :]
+    not_green = ~green
+    codes = np.zeros(green.shape[:2], dtype=np.uint8)
+    for i in range(5):
+        gi = guesses[:, i][:, None]
+        avail = np.zeros(green.shape[:2], dtype=np.uint8)
+        for k in range(5):
+            avail += (answers[:, k][None, :] == gi) & not_green[:, :, k]
+        used = np.zeros(green.shape[:2], dtype=np.uint8)
+        for j in range(i):
+            same = (guesses[:, j] == guesses[:, i])[:, None]
+            used += same & not_green[:, :, j]
+        yellow = not_green[:, :, i] & (used < avail)
+        codes += (green[:, :, i].astype(np.uint8) * 2 + yellow) * _POW3[i]
+    return codes
+
+class PatternMatrix:
+    """Tabla guess x answer con el codigo de patron de cada par.
+
+    Se construye una vez por diccionario y se persiste en disco (formato propio,
+    cargado via mmap), de modo que el calculo de entropia y el filtrado pasan a
+    ser busquedas en tabla en lugar de comparar cadenas.
+    """
+
+    MAGIC = b"WPMX\x01\x00\x00\x00"
+    _HEADER = struct.Struct("<8sII20s20s")
+
+    def __init__(self, guesses: Sequence[str], answers: Sequence[str], data) -> None:
+        self.guesses = tuple(guesses)
+        self.answers = tuple(answers)
+        self.guess_index = {w: i for i, w in enumerate(self.guesses)}
+        self.answer_index = {w: i for i, w in enumerate(self.answers)}
+        self._data = data  # buffer plano fila-major de len(guesses) * len(answers) bytes
+        self._width = len(self.answers)
+
+    @classmethod
+    def build(cls, guesses: Sequence[str], answers: Sequence[str], block: int = 256) -> "PatternMatrix":
+        """Calcula la matriz completa (vectorizada con NumPy si esta disponible)."""
+        if np is not None:
+            enc_g = _encode_words(guesses)
+            enc_a = _encode_words(answers)
+            data = np.empty((len(guesses), len(answers)), dtype=np.uint8)
+            for start in range(0, len(guesses), block):
+                data[start:start + block] = _pattern_codes_np(enc_g[start:start + block], enc_a)
+            return cls(guesses, answers, data.reshape(-1))
+        data = bytearray()
+        for g in guesses:
+            data.extend(_pattern_code(g, a) for a in answers)
+        return cls(guesses, answers, memoryview(bytes(data)))
+
+    @staticmethod
+    def path_for(guesses: Sequence[str], answers: Sequence[str], directory: str = CACHE_DIR) -> str:
+        key = hashlib.sha1((_words_digest(guesses) + _words_digest(answers)).encode()).hexdigest()
+        return os.path.join(directory, f"patterns-{key[:16]}.bin")
+
+    def save(self, path: str) -> None:
+        """Escribe la matriz en disco (escritura atomica via archivo temporal)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        header = self._HEADER.pack(
+            self.MAGIC,
+            len(self.guesses),
+            len(self.answers),
+            bytes.fromhex(_words_digest(self.guesses)),
+            bytes.fromhex(_words_digest(self.answers)),
+        )
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(self._data.tobytes() if np is not None and isinstance(self._data, np.ndarray) else bytes(self._data))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, guesses: Sequence[str], answers: Sequence[str]) -> Optional["PatternMatrix"]:
+        """Carga la matriz via mmap; None si no existe o no corresponde a estas listas."""
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        size = cls._HEADER.size
+        if len(mm) < size:
+            return None
+        magic, n_g, n_a, dg, da = cls._HEADER.unpack_from(mm, 0)
+        if (
+            magic != cls.MAGIC
+            or n_g != len(guesses)
+            or n_a != len(answers)
+            or dg.hex() != _words_digest(guesses)
+            or da.hex() != _words_digest(answers)
+            or len(mm) != size + n_g * n_a
+        ):
+            return None
+        if np is not None:
+            data = np.frombuffer(mm, dtype=np.uint8, offset=size)
+        else:
+            data = memoryview(mm)[size:]
+        return cls(guesses, answers, data)
+
+    def row(self, guess: str):
+        """Fila de codigos para `guess` (None si no esta en la matriz)."""
+        gi = self.guess_index.get(guess)
+        if gi is None:
+            return None
+        return self._data[gi * self._width:(gi + 1) * self._width]
+
+    def positions(self, words: Sequence[str], answers: bool = True):
+        """Indices (array NumPy) de `words` en el eje de respuestas o de guesses; None si falta alguna."""
+        idx = self.answer_index if answers else self.guess_index
+        try:
+            return np.fromiter((idx[w] for w in words), dtype=np.intp, count=len(words))
+        except KeyError:
+            return None
+
+    def block(self, guess_positions, answer_positions):
+        """Submatriz (B, M) de codigos para los indices dados (requiere NumPy)."""
+        grid = self._data.reshape(len(self.guesses), self._width)
+        return grid[guess_positions[:, None], answer_positions[None, :]]
+
+    def codes(self, guess: str, answers: Sequence[str]) -> Optional[List[int]]:
+        """Codigos de patron de `guess` contra cada respuesta, o None si falta alguna."""
+        row = self.row(guess)
+        if row is None:
+            return None
+        idx = self.answer_index
+        try:
+            positions = [idx[a] for a in answers]
+        except KeyError:
+            return None
+        if np is not None and isinstance(row, np.ndarray):
+            return row[np.asarray(positions, dtype=np.intp)].tolist()
+        return [row[i] for i in positions]
+
+# Diccionario de la partida que se esta puntuando; las tablas aceleradas (matriz de
+# patrones, pool de procesos) se eligen por su huella. Sin fijar, el idioma por defecto.
+_SCORING_DICTIONARY: contextvars.ContextVar[Optional[Dictionary]] = contextvars.ContextVar("scoring_dictionary", default=None)
+
+@contextlib.contextmanager
+def _scoring_dictionary(dictionary: Dictionary):
+    """Fija el diccionario activo para la puntuacion dentro del bloque."""
+    token = _SCORING_DICTIONARY.set(dictionary)
+    try:
+        yield dictionary
+    finally:
+        _SCORING_DICTIONARY.reset(token)
+
+def _active_dictionary() -> Dictionary:
+    return _SCORING_DICTIONARY.get() or _get_dictionary()
+
+PATTERN_MATRIX_ENABLED = os.environ.get("WORDLE_PATTERN_MATRIX", "").lower() in ("1", "true", "yes")
+_PATTERN_MATRICES: Dict[str, PatternMatrix] = {} # digest del diccionario -> matriz
+_PATTERN_MATRIX_LOCK = threading.Lock()
+
+def _load_pattern_matrix(dictionary: Dictionary) -> PatternMatrix:
+    """Carga de disco (o construye y persiste) la matriz de `dictionary`, una vez por version."""
+    with _PATTERN_MATRIX_LOCK:
+        pm = _PATTERN_MATRICES.get(dictionary.digest)
+        if pm is not None:
+            return pm
+        words = dictionary.words
+        path = PatternMatrix.path_for(words, words)
+        pm = PatternMatrix.load(path, words, words)
+        if pm is None:
+            log.info("Construyendo matriz de patrones %dx%d en %s", len(words), len(words), path)
+            pm = PatternMatrix.build(words, words)
+            try:
+                pm.save(path)
+            except OSError as e:
+                log.warning("No se pudo guardar la matriz de patrones: %s", e)
+        _PATTERN_MATRICES[dictionary.digest] = pm
+        return pm
+
+def _get_pattern_matrix() -> Optional[PatternMatrix]:
+    """Matriz del diccionario activo; con WORDLE_PATTERN_MATRIX=1 (o --pattern-matrix) se carga
+    perezosamente la primera vez que se puntua en cada idioma."""
+    d = _active_dictionary()
+    pm = _PATTERN_MATRICES.get(d.digest)
+    if pm is None and PATTERN_MATRIX_ENABLED:
+        pm = _load_pattern_matrix(d)
+    return pm
+
+# -------------------------
+# Funciones de entropía y sugerencias
+# -------------------------
+
+def _entropy_for_guess(guess: str, answers: Sequence[str]) -> Tuple[float, float]:
+    """Retorna (entropia bits, expected_remaining) para `guess` dado el conjunto actual de respuestas."""
+    n = len(answers)
+    if n == 0:
+        return 0.0, 0.0
+        
+    pm = _get_pattern_matrix()
+    codes = pm.codes(guess, answers) if pm is not None else None
+    buckets: Dict = defaultdict(int)
+    if codes is not None:
+        for c in codes:
+            buckets[c] += 1
+    else:
+        for ans in answers:
+            p = _pattern(guess, ans)
+            buckets[p] += 1
+    
+    H = 0.0
+    exp_rem = 0.0
+    # En orden de tamaño, como `_entropy_from_codes_np`: particiones iguales dan sumas identicas
+    for cnt in sorted(buckets.values()):
+        if cnt > 0:
+            p = cnt / n
+            H -= p * math.log2(p)
+            exp_rem += p * cnt
+    return H, exp_rem
+
+ENTROPY_BLOCK = 256  # guesses por bloque en la ruta vectorizada
+
+def _entropy_from_codes_np(codes):
+    """(bits, expected_remaining) por fila de una matriz (B, M) de codigos de patron."""
+    n_rows, n = codes.shape
+    offsets = (np.arange(n_rows, dtype=np.intp) * N_PATTERNS)[:, None]
+    counts = np.bincount((codes + offsets).ravel(), minlength=n_rows * N_PATTERNS)
+    # Ordenar los cubos hace que la suma no dependa de que patrones salieron,
+    # solo de sus tamaños (empates exactos entre guesses equivalentes).
+    counts = np.sort(counts.reshape(n_rows, N_PATTERNS), axis=1)
+    p = counts / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plogp = np.where(counts > 0, p * np.log2(p), 0.0)
+    # abs == negacion (la suma es <= 0) pero sin producir -0.0
+    return np.abs(plogp.sum(axis=1)), (p * counts).sum(axis=1)
+
+def _entropy_block_np(enc_guesses, enc_answers):
+    """(bits, expected_remaining) para un bloque de guesses codificados contra las respuestas."""
+    return _entropy_from_codes_np(_pattern_codes_np(enc_guesses, enc_answers))
+
+# -------------------------
+# Progreso de la puntuacion
+# -------------------------
+
+PROGRESS_INTERVAL = 0.25 # segundos minimos entre notificaciones
+
+class ScoringCancelled(Exception):
+    """La peticion que pidio la puntuacion fue cancelada."""
+
+class ScoringProgress:
+    """Acumula los pares (guess, answer) evaluados y avisa a `callback(done, total, best)`.
+
+    Las pasadas de puntuacion (`_best_by_entropy`) lo encuentran en `_SCORING_PROGRESS`;
+    entre bloques llaman a `advance` con las puntuaciones parciales. Las notificaciones se
+    espacian `interval` segundos, `best` es el top-k provisional, y `cancel()` hace que el
+    siguiente `advance` aborte la puntuacion con ScoringCancelled.
+    """
+
+    def __init__(self, callback, top_k: int = 5, interval: float = PROGRESS_INTERVAL) -> None:
+        self.callback = callback
+        self.top_k = top_k
+        self.interval = interval
+        self.done = 0
+        self.total = 0
+        self.reported = -1 # ultimo `done` notificado
+        self._pass_start = 0
+        self._last = 0.0
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def begin(self, pairs: int) -> None:
+        """Nueva pasada de `pairs` pares; el total crece, el avance nunca retrocede."""
+        self._pass_start = self.done
+        self.total = self.done + pairs
+
+    def advance(self, pairs_done: int, scores: Sequence[Tuple[str, float, float]] = (), final: bool = False) -> None:
+        """`pairs_done` = pares evaluados en la pasada actual; `scores` = puntuaciones parciales.
+
+        `final` marca el ultimo bloque de la pasada: se notifica aunque no haya pasado `interval`,
+        para que el cliente reciba el top-k de la pasada completa.
+        """
+        if self._cancelled.is_set():
+            raise ScoringCancelled()
+        self.done = self._pass_start + pairs_done
+        now = time.monotonic()
+        if not final and now - self._last < self.interval:
+            return
+        self._last = now
+        best = heapq.nsmallest(self.top_k, scores, key=lambda t: (-t[1], t[2]))
+        self.reported = self.done
+        self.callback(self.done, self.total, best)
+
+_SCORING_PROGRESS: contextvars.ContextVar[Optional[ScoringProgress]] = contextvars.ContextVar("scoring_progress", default=None)
+
+# `message` en report_progress no existe en las versiones antiguas de mcp
+_PROGRESS_MESSAGE = "message" in inspect.signature(Context.report_progress).parameters
+
+def _report_progress(ctx: Context, done: float, total: float, message: str):
+    """Corrutina de notificacion de progreso; omite `message` si el mcp instalado no lo acepta."""
+    if _PROGRESS_MESSAGE:
+        return ctx.report_progress(done, total, message)
+    return ctx.report_progress(done, total)
+
+def _score_pool_np(pool: Sequence[str], answers: Sequence[str], block: int = ENTROPY_BLOCK) -> List[Tuple[str, float, float]]:
+    """Version vectorizada de `_entropy_for_guess` sobre todo el pool, en el orden del pool."""
+    pm = _get_pattern_matrix()
+    g_pos = a_pos = None
+    if pm is not None:
+        g_pos = pm.positions(pool, answers=False)
+        a_pos = pm.positions(answers)
+    if g_pos is not None and a_pos is not None:
+        def block_scores(start: int):
+            return _entropy_from_codes_np(pm.block(g_pos[start:start + block], a_pos))
+    else:
+        enc_pool = _encode_words(pool)
+        enc_answers = _encode_words(answers)
+        def block_scores(start: int):
+            return _entropy_block_np(enc_pool[start:start + block], enc_answers)
+
+    progress = _SCORING_PROGRESS.get()
+    scores: List[Tuple[str, float, float]] = []
+    for start in range(0, len(pool), block):
+        bits, exp_rem = block_scores(start)
+        scores.extend(zip(pool[start:start + block], bits.tolist(), exp_rem.tolist()))
+        if progress is not None:
+            progress.advance(len(scores) * len(answers), scores, final=len(scores) == len(pool))
+    return scores
+
+# -------------------------
+# Evaluacion de entropia en paralelo (pool de procesos)
+# -------------------------
+
+ENTROPY_WORKERS = int(os.environ.get("WORDLE_WORKERS", "0") or 0)
+PARALLEL_MIN_PAIRS = 200_000  # por debajo de esto el coste de repartir no compensa
+
+_WORKER_WORDS = None  # (N, 5) uint8 en memoria compartida, visto desde cada worker
+_WORKER_SHM = None
+
+def _entropy_worker_init(shm_name: str, n_words: int) -> None:
+    """Inicializador de cada worker: adjunta el diccionario codificado compartido."""
+    global _WORKER_WORDS, _WORKER_SHM
+    # Los workers comparten el resource_tracker del proceso padre, que es quien
+    # desvincula el segmento en `EntropyPool.close`.
+    _WORKER_SHM = shared_memory.SharedMemory(name=shm_name)
+    _WORKER_WORDS = np.ndarray((n_words, 5), dtype=np.uint8, buffer=_WORKER_SHM.buf)
+
+def _entropy_worker_topk(offset: int, guess_positions, answer_positions, top_k: int) -> List[Tuple[int, float, float]]:
+    """Puntua un fragmento del pool y devuelve su top-k como (posicion en el pool, bits, exp_rem)."""
+    enc_answers = _WORKER_WORDS[answer_positions]
+    rows: List[Tuple[int, float, float]] = []
+    for start in range(0, len(guess_positions), ENTROPY_BLOCK):
+        enc_guesses = _WORKER_WORDS[guess_positions[start:start + ENTROPY_BLOCK]]
+        bits, exp_rem = _entropy_block_np(enc_guesses, enc_answers)
+        rows.extend(zip(range(offset + start, offset + start + len(enc_guesses)), bits.tolist(), exp_rem.tolist()))
+    rows.sort(key=lambda t: (-t[1], t[2], t[0]))
+    return rows[:top_k]
+
+class EntropyPool:
+    """Pool persistente de procesos para `_best_by_entropy`.
+
+    El diccionario codificado vive en memoria compartida: cada llamada solo envia
+    indices enteros, reparte el pool de guesses entre los workers y fusiona el
+    top-k de cada fragmento (mismo orden que la ruta de un solo nucleo).
+    """
+
+    def __init__(self, words: Sequence[str], workers: int) -> None:
+        self.words = tuple(words)
+        self.index = {w: i for i, w in enumerate(self.words)}
+        self.workers = workers
+        enc = _encode_words(self.words)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, enc.nbytes))
+        np.ndarray(enc.shape, dtype=np.uint8, buffer=self._shm.buf)[:] = enc
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_entropy_worker_init,
+            initargs=(self._shm.name, len(self.words)),
+        )
+
+    def _positions(self, words: Sequence[str]):
+        try:
+            return np.fromiter((self.index[w] for w in words), dtype=np.intp, count=len(words))
+        except KeyError:
+            return None
+
+    def best(
+        self,
+        pool: Sequence[str],
+        answers: Sequence[str],
+        top_k: int,
+        progress: Optional[ScoringProgress] = None,
+    ) -> Optional[List[Tuple[str, float, float]]]:
+        """Top-k de `pool` contra `answers`; None si alguna palabra no esta en el diccionario compartido."""
+        g_pos = self._positions(pool)
+        a_pos = self._positions(answers)
+        if g_pos is None or a_pos is None:
+            return None
+        shard = -(-len(pool) // self.workers)
+        futures = [
+            self._executor.submit(_entropy_worker_topk, start, g_pos[start:start + shard], a_pos, top_k)
+            for start in range(0, len(pool), shard)
+        ]
+        merged: List[Tuple[int, float, float]] = []
+        try:
+            # El orden de llegada no importa: la clave de orden incluye la posicion en el pool
+            for done, fut in enumerate(as_completed(futures), 1):
+                merged.extend(fut.result())
+                if progress is not None:
+                    pairs_done = min(done * shard, len(pool)) * len(answers)
+                    progress.advance(pairs_done, [(pool[i], b, e) for i, b, e in merged], final=done == len(futures))
+        except ScoringCancelled:
+            for fut in futures:
+                fut.cancel()
+            raise
+        merged.sort(key=lambda t: (-t[1], t[2], t[0]))
+        return [(pool[i], bits, exp_rem) for i, bits, exp_rem in merged[:top_k]]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+_ENTROPY_POOLS: Dict[str, EntropyPool] = {} # digest del diccionario -> pool
+_ENTROPY_POOL_WORKERS = 0 # workers por pool una vez activado el modo paralelo
+_ENTROPY_POOL_LOCK = threading.Lock()
+
+def _start_entropy_pool(workers: int, dictionary: Optional[Dictionary] = None) -> Optional[EntropyPool]:
+    """Arranca el pool de workers de `dictionary` (por defecto, el activo; requiere NumPy).
+
+    workers <= 1 deja la ruta de un nucleo. Activado el modo paralelo, los demas idiomas
+    arrancan su propio pool con los mismos workers la primera vez que se puntuan.
+    """
+    global _ENTROPY_POOL_WORKERS
+    d = dictionary or _active_dictionary()
+    with _ENTROPY_POOL_LOCK:
+        ep = _ENTROPY_POOLS.get(d.digest)
+        if ep is not None:
+            return ep
+        if workers <= 1:
+            return None
+        if np is None:
+            log.warning("El modo paralelo requiere NumPy; se usa un solo nucleo")
+            return None
+        if not _ENTROPY_POOLS:
+            atexit.register(_stop_entropy_pool)
+        ep = _ENTROPY_POOLS[d.digest] = EntropyPool(d.words, workers)
+        _ENTROPY_POOL_WORKERS = workers
+        return ep
+
+def _stop_entropy_pool() -> None:
+    global _ENTROPY_POOL_WORKERS
+    with _ENTROPY_POOL_LOCK:
+        for ep in _ENTROPY_POOLS.values():
+            ep.close()
+        _ENTROPY_POOLS.clear()
+        _ENTROPY_POOL_WORKERS = 0
+
+def _get_entropy_pool() -> Optional[EntropyPool]:
+    """Pool del diccionario activo; con WORDLE_WORKERS=N se arranca perezosamente al primer uso."""
+    ep = _ENTROPY_POOLS.get(_active_dictionary().digest)
+    if ep is None:
+        workers = _ENTROPY_POOL_WORKERS or ENTROPY_WORKERS
+        if workers > 1:
+            return _start_entropy_pool(workers)
+    return ep
+
+def _best_by_entropy(
+    guess_pool: Sequence[str],
+    answers: Sequence[str],
+    top_k: int = 5,
+    sample_answers: Optional[int] = None,
+    limit_guess_pool: Optional[int] = None,
+) -> List[Tuple[str, float, float]]:
+    """Evalua entropia para cada palabra del pool.
+
+    Orden: bits desc, `expected_remaining` asc y, en empate exacto, la posicion en
+    `guess_pool` (en la apertura, el orden por diversidad de `_get_diverse_words`).
+    """
+    if not guess_pool or not answers:
+        return []
+        
+    answers_eval = answers
+    if sample_answers and len(answers) > sample_answers:
+        step = max(1, len(answers) // sample_answers)
+        answers_eval = answers[::step][:sample_answers]
+
+    pool = guess_pool[:limit_guess_pool] if limit_guess_pool else guess_pool
+    pairs = len(pool) * len(answers_eval)
+    started = time.perf_counter()
+    progress = _SCORING_PROGRESS.get()
+    if progress is not None:
+        progress.begin(pairs)
+
+    ep = _get_entropy_pool()
+    if ep is not None and pairs >= PARALLEL_MIN_PAIRS:
+        best = ep.best(pool, answers_eval, top_k, progress)
+        if best is not None:
+            _record_throughput(pairs, time.perf_counter() - started)
+            return best
+
+    if np is not None:
+        scores = _score_pool_np(pool, answers_eval)
+    else:
+        scores = []
+        for w in pool:
+            bits, exp_rem = _entropy_for_guess(w, answers_eval)
+            scores.append((w, bits, exp_rem))
+            if progress is not None:
+                progress.advance(len(scores) * len(answers_eval), scores, final=len(scores) == len(pool))
+    _record_throughput(pairs, time.perf_counter() - started)
+
+    # Orden: bits desc, expected_remaining asc
+    scores.sort(key=lambda t: (-t[1], t[2]))
+    return scores[:top_k]
+
+# Estimacion de pares (guess, answer) evaluados por segundo, para planificar el
+# modo exacto dentro de un presupuesto de latencia. Arranca con un valor
+# conservador segun el motor y se ajusta con cada evaluacion real.
+_THROUGHPUT_MIN_PAIRS = 50_000 # evaluaciones mas chicas no son representativas
+_THROUGHPUT = {"pairs_per_second": 0.0, "analysis_seconds_per_candidate": 0.0}
+_THROUGHPUT_LOCK = threading.Lock()
+
+def _record_throughput(pairs: int, seconds: float) -> None:
+    if pairs < _THROUGHPUT_MIN_PAIRS or seconds <= 0:
+        return
+    rate = pairs / seconds
+    with _THROUGHPUT_LOCK:
+        prev = _THROUGHPUT["pairs_per_second"]
+        _THROUGHPUT["pairs_per_second"] = rate if prev == 0 else 0.7 * prev + 0.3 * rate
+
+def _estimated_throughput() -> float:
+    rate = _THROUGHPUT["pairs_per_second"]
+    if rate:
+        return rate
+    if np is None:
+        return 3e5
+    workers = max(1, _ENTROPY_POOL_WORKERS)
+    return 5e6 * workers
+
+# Lo mismo para el analisis de candidatas que arma la respuesta despues de puntuar:
+# la busqueda anytime reserva ese tiempo del plazo.
+_ANALYSIS_MIN_CANDIDATES = 1000
+
+def _record_analysis_cost(n_candidates: int, seconds: float) -> None:
+    if n_candidates < _ANALYSIS_MIN_CANDIDATES or seconds <= 0:
+        return
+    cost = seconds / n_candidates
+    with _THROUGHPUT_LOCK:
+        prev = _THROUGHPUT["analysis_seconds_per_candidate"]
+        _THROUGHPUT["analysis_seconds_per_candidate"] = cost if prev == 0 else 0.7 * prev + 0.3 * cost
+
+def _estimated_analysis_seconds(n_candidates: int) -> float:
+    return (_THROUGHPUT["analysis_seconds_per_candidate"] or 5e-7) * n_candidates
+
+# Presupuesto de `exact=True` cuando la peticion no trae `budget_ms`: sin el, la apertura
+# sobre el diccionario completo evalua ~N^2 pares (minutos). 0 = sin limite.
+EXACT_BUDGET_MS = float(os.environ.get("WORDLE_EXACT_MS", "5000"))
+
+def _exact_plan(n_guesses: int, n_answers: int, budget_ms: Optional[float]) -> Tuple[int, int]:
+    """Cuantos (guesses, answers) se pueden evaluar sin pasar de `budget_ms`.
+
+    Sin presupuesto, o si la evaluacion completa cabe, devuelve los tamaños completos;
+    si no, reduce ambos ejes en la misma proporcion.
+    """
+    total = n_guesses * n_answers
+    if not budget_ms or total == 0:
+        return n_guesses, n_answers
+    affordable = _estimated_throughput() * budget_ms / 1000.0
+    if total <= affordable:
+        return n_guesses, n_answers
+    f = math.sqrt(affordable / total)
+    return (
+        min(n_guesses, max(min(50, n_guesses), int(n_guesses * f))),
+        min(n_answers, max(min(100, n_answers), int(n_answers * f))),
+    )
+
+def _get_diverse_words(words: Sequence[str], candidates: Sequence[str], limit: Optional[int] = None) -> List[str]:
+    """Selecciona palabras con letras diversas para early game."""
+    if not words or not candidates:
+        return words
+    if np is not None:
+        return _get_diverse_words_np(words, candidates, limit)
+    
+    # Contar frecuencia de letras en candidatos
+    letter_freq = defaultdict(int)
+    for word in candidates:
+        for char in set(word):  # Contar cada letra solo una vez por palabra
+            letter_freq[char] += 1
+    
+    # Puntuar palabras por diversidad y frecuencia de letras
+    word_scores = []
+    for word in words:
+        unique_letters = len(set(word))
+        freq_score = sum(letter_freq.get(char, 0) for char in set(word))
+        # Penalizar letras repetidas, premiar letras comunes
+        diversity_score = unique_letters * 2 + freq_score / len(candidates) if candidates else unique_letters
+        word_scores.append((word, diversity_score))
+    
+    # Ordenar por puntaje y tomar los mejores
+    word_scores.sort(key=lambda x: -x[1])
+    selected = [w for w, _ in word_scores[:limit or len(word_scores)]]
+    
+    return selected
+
+def _letter_presence_np(words: Sequence[str]):
+    """Matriz (N, 26) bool: que letras aparecen en cada palabra."""
+    enc = _encode_words(words)
+    presence = np.zeros((len(words), 26), dtype=bool)
+    presence[np.arange(len(words))[:, None], enc] = True
+    return presence
+
+def _get_diverse_words_np(words: Sequence[str], candidates: Sequence[str], limit: Optional[int] = None) -> List[str]:
+    """Version vectorizada de `_get_diverse_words` (mismos puntajes y mismo orden estable)."""
+    presence = _letter_presence_np(words)
+    letter_freq = _letter_presence_np(candidates).sum(axis=0, dtype=np.int64)
+    scores = presence.sum(axis=1, dtype=np.int64) * 2 + (presence @ letter_freq) / len(candidates)
+    order = np.argsort(-scores, kind="stable")[:limit or len(words)]
+    return [words[i] for i in order.tolist()]
+
+def _rerank_suggestions(
+    scored: List[Tuple[str, float, float]], 
+    candidates: CandidateSet, 
+    phase: str, 
+    attempts: int
+) -> List[Tuple[str, float, float]]:
+    """Reordena sugerencias considerando la fase del juego."""
+    if phase == "end" and len(candidates) <= 5:
+        # En end game con pocas opciones, priorizar candidatos reales
+        candidate_suggestions = [(w, b, e) for w, b, e in scored if w in candidates]
+        non_candidate_suggestions = [(w, b, e) for w, b, e in scored if w not in candidates]
+        
+        # Si hay candidatos con buena entropía, ponerlos primero
+        if candidate_suggestions:
+            candidate_suggestions.sort(key=lambda x: (-x[1], x[2]))
+            non_candidate_suggestions.sort(key=lambda x: (-x[1], x[2]))
+            return candidate_suggestions + non_candidate_suggestions
+    
+    # Para otras fases, mantener orden por entropía
+    return scored
+
+def _analyze_remaining_candidates(candidates: Sequence[str], history: List[Tuple[str, str]]) -> dict:
+    """Analiza los candidatos restantes para dar insights útiles."""
+    n = len(candidates)
+    if n == 0:
+        return {"count": 0, "message": "No quedan candidatos válidos"}
+    
+    if n == 1:
+        return {
+            "count": 1, 
+            "message": f"¡Solo queda un candidato: '{candidates[0]}'!",
+            "final_answer": candidates[0]
+        }
+    
+    # Analizar letras comunes en posiciones específicas
+    # Counter cuenta en C y conserva el orden de primera aparicion (desempates)
+    joined = "".join(candidates)
+    position_letters = [Counter(joined[i::5]) for i in range(5)]
+    
+    # Encontrar posiciones más/menos determinadas
+    position_entropy = []
+    for i, pos_counts in enumerate(position_letters):
+        if not pos_counts:
+            continue
+        total = sum(pos_counts.values())
+        entropy = -sum((count/total) * math.log2(count/total) for count in pos_counts.values() if count > 0)
+        position_entropy.append((i, entropy, pos_counts))
+    
+    analysis = {
+        "count": n,
+        "message": f"Quedan {n} candidatos posibles",
+    }
+    
+    if n <= 20:
+        analysis["candidates_list"] = list(candidates[:20])  # Limitar para evitar spam
+    
+    if position_entropy:
+        position_entropy.sort(key=lambda x: x[1])  # Menos entropía = más determinada
+        
+        most_determined = position_entropy[0]
+        if most_determined[1] < 1.0:  # Entropía baja = posición casi determinada
+            pos, _, letters = most_determined
+            most_common = max(letters.items(), key=lambda x: x[1])
+            analysis["most_likely_position"] = {
+                "position": pos + 1,
+                "letter": most_common[0],
+                "probability": round(most_common[1] / n, 2)
+            }
+        
+        if len(position_entropy) > 1:
+            least_determined = position_entropy[-1]
+            if least_determined[1] > 2.0:  # Entropía alta = mucha incertidumbre
+                pos, _, letters = least_determined
+                analysis["most_uncertain_position"] = {
+                    "position": pos + 1,
+                    "possible_letters": len(letters),
+                    "top_letters": sorted(letters.items(), key=lambda x: -x[1])[:3]
+                }
+    
+    return analysis
+
+def _game_phase(attempts: int) -> str:
+    return "early" if attempts <= 1 else "mid" if attempts <= 3 else "end"
+
+def _score_guesses(
+    candidate_set: CandidateSet,
+    pool_set: CandidateSet,
+    game_phase: str,
+    top_k: int,
+    approx_when_large: bool = True,
+    exact: bool = False,
+    budget_ms: Optional[float] = None,
+    deadline_ms: Optional[float] = None,
+    started: Optional[float] = None,
+) -> Tuple[List[Tuple[str, float, float]], dict]:
+    """Puntua el pool segun la fase del juego.
+
+    Devuelve (top_k por entropia, evaluacion), donde la evaluacion indica si el
+    resultado es exacto y cuantas guesses/answers se evaluaron realmente.
+    Con `deadline_ms` se usa la busqueda anytime (ver `_score_guesses_anytime`); el plazo
+    corre desde `started` (perf_counter al entrar a la herramienta) si se indica.
+    """
+    if deadline_ms:
+        return _score_guesses_anytime(
+            candidate_set, pool_set, game_phase, top_k, deadline_ms, sample=not exact, started=started
+        )
+
+    n = len(candidate_set)
+    candidates = candidate_set.words()
+    guess_pool = pool_set.words()
+
+    if exact:
+        return _score_guesses_exact(candidate_set, pool_set, top_k, budget_ms)
+
+    # Heurísticas de rendimiento adaptativas
+    sample_answers = None
+    limit_guesses = None
+    if approx_when_large:
+        if n > 1000:
+            sample_answers = min(2000, max(500, n // 2))
+        if len(pool_set) > 2000:
+            limit_guesses = min(3000, max(1000, len(pool_set) // 2))
+    
+    # Usar un subset del guess pool para acelerar
+    guess_pool_to_use = guess_pool
+    
+    # Estrategia por fase de juego
+    if game_phase == "early":
+        # Early game: priorizar palabras con letras diferentes y comunes
+        with _log_stage("diverse"):
+            guess_pool_to_use = _get_diverse_words(guess_pool, candidates, limit_guesses)
+        log.debug("Early game: usando %d palabras diversas", len(guess_pool_to_use))
+    elif game_phase == "end" and n <= 10:
+        # End game: priorizar candidatos reales
+        candidate_guesses = [w for w in candidates if w in pool_set]
+        if candidate_guesses:
+            # Evaluar candidatos + algunas palabras de alta entropía
+            top_entropy = _best_by_entropy(
+                guess_pool[:500],
+                candidates,
+                top_k=10,
+                sample_answers=sample_answers,
+            )
+            top_entropy_words = [w for w, _, _ in top_entropy]
+            guess_pool_to_use = list(set(candidate_guesses + top_entropy_words))
+            log.debug("End game: %d candidatos + %d alta entropía", len(candidate_guesses), len(top_entropy_words))
+    
+    # Calcular entropías
+    scored = _best_by_entropy(
+        guess_pool_to_use,
+        candidates,
+        top_k=top_k,
+        sample_answers=sample_answers,
+        limit_guess_pool=limit_guesses,
+    )
+    guesses_evaluated = min(len(guess_pool_to_use), limit_guesses) if limit_guesses else len(guess_pool_to_use)
+    answers_evaluated = min(n, sample_answers) if sample_answers else n
+    return scored, {
+        "exact": guesses_evaluated == len(pool_set) and answers_evaluated == n,
+        "guesses_evaluated": guesses_evaluated,
+        "answers_evaluated": answers_evaluated,
+    }
+
+def _score_guesses_exact(
+    candidate_set: CandidateSet,
+    pool_set: CandidateSet,
+    top_k: int,
+    budget_ms: Optional[float] = None,
+) -> Tuple[List[Tuple[str, float, float]], dict]:
+    """Evalua el pool completo contra todas las candidatas, sin muestreo por saltos.
+
+    Si `budget_ms` (por defecto EXACT_BUDGET_MS) no alcanza para la evaluacion completa,
+    se evaluan primero las guesses mas diversas y una muestra aleatoria uniforme
+    (determinista por estado) de las candidatas, y el resultado se marca como aproximado.
+    """
+    budget_ms = budget_ms or EXACT_BUDGET_MS or None
+    candidates = candidate_set.words()
+    guess_pool = pool_set.words()
+    n_guesses, n_answers = _exact_plan(len(guess_pool), len(candidates), budget_ms)
+    pool = guess_pool
+    answers = candidates
+    if n_guesses < len(guess_pool):
+        with _log_stage("diverse"):
+            pool = _get_diverse_words(guess_pool, candidates, n_guesses)
+    if n_answers < len(candidates):
+        answers = _sample_answers(candidate_set, candidates, n_answers)
+    scored = _best_by_entropy(pool, answers, top_k=top_k)
+    return scored, {
+        "exact": n_guesses == len(guess_pool) and n_answers == len(candidates),
+        "guesses_evaluated": n_guesses,
+        "answers_evaluated": n_answers,
+    }
+
+def _sample_answers(candidate_set: CandidateSet, candidates: Sequence[str], n: int) -> List[str]:
+    """Muestra uniforme de `n` candidatas, determinista por estado y en el orden del diccionario."""
+    rng = random.Random(candidate_set.fingerprint())
+    picked = sorted(rng.sample(range(len(candidates)), n))
+    return [candidates[i] for i in picked]
+
+ANYTIME_MIN_GUESSES = 500 # guesses que deben caber en el plazo al elegir la muestra de respuestas
+ANYTIME_SLICES = 8 # el plazo se reparte en ~8 tandas para cortar a tiempo
+
+def _score_guesses_anytime(
+    candidate_set: CandidateSet,
+    pool_set: CandidateSet,
+    game_phase: str,
+    top_k: int,
+    deadline_ms: float,
+    sample: bool = True,
+    started: Optional[float] = None,
+) -> Tuple[List[Tuple[str, float, float]], dict]:
+    """Busqueda "anytime": puntua el pool de la guess mas prometedora a la menos y corta al vencer el plazo.
+
+    El orden es el de `_get_diverse_words` (en fase final, las candidatas primero). Con `sample`
+    las respuestas se reducen a una muestra uniforme para que al menos ANYTIME_MIN_GUESSES
+    guesses quepan en `deadline_ms`.
+
+    El plazo corre desde `started` (la entrada a la herramienta), asi que la sesion, la
+    materializacion de candidatas y el orden del pool tambien lo consumen, y se reserva el
+    analisis de candidatas que arma la respuesta; la primera tanda se recorta a lo que cabe
+    en el tiempo restante. Siempre se evaluan al menos `top_k`
+    guesses, por lo que el plazo minimo que se cumple es el costo de esa preparacion (ver README).
+    """
+    if started is None:
+        started = time.perf_counter()
+    candidates = candidate_set.words()
+    # El analisis de candidatas de la respuesta corre despues; se le reserva su parte
+    deadline = started + deadline_ms / 1000.0 - _estimated_analysis_seconds(len(candidates))
+    guess_pool = pool_set.words()
+    throughput = _estimated_throughput()
+    affordable = throughput * max(0.0, deadline - time.perf_counter())
+    answers = candidates
+    if sample:
+        n_answers = min(len(candidates), max(min(100, len(candidates)), int(affordable / ANYTIME_MIN_GUESSES)))
+        if n_answers < len(candidates):
+            answers = _sample_answers(candidate_set, candidates, n_answers)
+
+    with _log_stage("diverse"):
+        order = _get_diverse_words(guess_pool, candidates)
+    if game_phase == "end":
+        first = [w for w in candidates if w in pool_set]
+        chosen = set(first)
+        order = first + [w for w in order if w not in chosen]
+
+    # La primera tanda sale de la estimacion global, recortada a lo que queda del plazo tras
+    # la preparacion; las siguientes, del tiempo medido por guess
+    chunk = max(64, min(4096, int(affordable / ANYTIME_SLICES / len(answers))))
+    fits = int(throughput * max(0.0, deadline - time.perf_counter()) / len(answers))
+    chunk = max(top_k, min(chunk, fits))
+    scored: List[Tuple[str, float, float]] = []
+    evaluated = 0
+    while evaluated < len(order):
+        t0 = time.perf_counter()
+        part = order[evaluated:evaluated + chunk]
+        scored.extend(_best_by_entropy(part, answers, top_k=len(part)))
+        evaluated += len(part)
+        now = time.perf_counter()
+        per_guess = (now - t0) / len(part)
+        chunk = min(4096, int((deadline - now) / per_guess / 2)) if per_guess > 0 else 4096
+        if chunk < 16:
+            break
+    scored.sort(key=lambda t: (-t[1], t[2]))
+    log.debug("Anytime: %d/%d guesses x %d respuestas en %s ms", evaluated, len(guess_pool), len(answers), deadline_ms)
+    return scored[:top_k], {
+        "exact": evaluated == len(guess_pool) and len(answers) == len(candidates),
+        "guesses_evaluated": evaluated,
+        "answers_evaluated": len(answers),
+        "pool_size": len(guess_pool),
+        "deadline_ms": deadline_ms,
+        "stopped_by_deadline": evaluated < len(order),
+    }
+
+# -------------------------
+# Lookahead a dos jugadas
+# -------------------------
+
+LOOKAHEAD_SHORTLIST = 20 # guesses de mayor entropia que se evaluan a dos jugadas
+LOOKAHEAD_CANDIDATE_POOL = 500 # hasta este tamaño tambien se consideran las mejores candidatas
+LOOKAHEAD_SECOND_PLY = 40 # candidatas de cada sub-particion probadas como segunda jugada
+LOOKAHEAD_MAX_CANDIDATES = int(os.environ.get("WORDLE_LOOKAHEAD_MAX", "2000"))
+LOOKAHEAD_BUDGET_MS = float(os.environ.get("WORDLE_LOOKAHEAD_MS", "300"))
+LOOKAHEAD_DEADLINE_SHARE = 0.5 # con `deadline_ms`, fraccion del plazo para la puntuacion; el resto, lookahead
+LEAF_BRANCHING = 8.0 # particiones efectivas por jugada al estimar conjuntos sin explorar
+
+def _leaf_cost(m: int) -> float:
+    """Jugadas esperadas (estimadas) para resolver entre `m` candidatas sin explorarlas.
+
+    Exacto para m <= 2 (1 y 1.5); para m mayor, una jugada mas por cada factor
+    LEAF_BRANCHING de candidatas, descontando la chance 1/m de acertar de una.
+    """
+    if m <= 0:
+        return 0.0
+    if m == 1:
+        return 1.0
+    return 1.0 + (1.0 - 1.0 / m) * max(1.0, math.log(m, LEAF_BRANCHING))
+
+def _lower_bound(m: int) -> float:
+    """Cota inferior de jugadas para `m` candidatas: a lo sumo se acierta en la siguiente."""
+    if m <= 0:
+        return 0.0
+    return (2 * m - 1) / m
+
+def _buckets(codes_row) -> List:
+    """Indices de respuestas agrupados por patron, sin el cubo de acierto (GGGGG)."""
+    order = np.argsort(codes_row, kind="stable")
+    ordered = codes_row[order]
+    cuts = np.flatnonzero(np.diff(ordered)) + 1
+    return [b for b in np.split(order, cuts) if codes_row[b[0]] != ALL_GREEN]
+
+def _lookahead_rank(
+    candidate_set: CandidateSet,
+    scored: Sequence[Tuple[str, float, float]],
+    budget_ms: float = LOOKAHEAD_BUDGET_MS,
+) -> Tuple[List[Tuple[str, float, float, float]], dict]:
+    """Reordena `scored` por jugadas esperadas hasta resolver, mirando dos jugadas (requiere NumPy).
+
+    Para cada guess de la shortlist se particionan las candidatas por patron; cada
+    sub-particion se valora con la mejor segunda jugada (sus propias candidatas y la
+    shortlist) y hojas estimadas con `_leaf_cost`. Las sub-particiones repetidas se
+    memoizan y una guess se poda en cuanto su costo parcial mas la cota inferior del
+    resto no puede mejorar a la mejor encontrada; su valor queda como cota inferior
+    (y su palabra en `stats["bounded"]`). Agotado `budget_ms`, la guess en curso queda
+    con su cota inferior y las restantes se valoran a una jugada.
+    Devuelve [(word, bits, expected_remaining, expected_guesses)] ordenado y estadisticas.
+    """
+    started = time.perf_counter()
+    deadline = started + budget_ms / 1000.0
+    candidates = candidate_set.words()
+    n = len(candidates)
+    entries = list(scored[:LOOKAHEAD_SHORTLIST])
+    listed = {w for w, _, _ in entries}
+    # Las candidatas pueden acertar: se suman las de mayor entropia entre ellas
+    if n <= LOOKAHEAD_CANDIDATE_POOL:
+        own = _best_by_entropy(candidates, candidates, top_k=LOOKAHEAD_SHORTLIST)
+        entries += [t for t in own if t[0] not in listed]
+    shortlist = [w for w, _, _ in entries]
+
+    enc_c = _encode_words(candidates)
+    enc_s = _encode_words(shortlist)
+    first = _pattern_codes_np(enc_s, enc_c)
+    leaf = np.array([_leaf_cost(m) for m in range(n + 1)])
+    memo: Dict[bytes, float] = {}
+    stats = {"shortlist": len(shortlist), "expanded": 0, "pruned": 0, "memo_hits": 0, "complete": True}
+    bounded = set()
+
+    def second_ply(idx) -> float:
+        m = len(idx)
+        if m <= 2:
+            return _leaf_cost(m)
+        key = idx.tobytes()
+        cached = memo.get(key)
+        if cached is not None:
+            stats["memo_hits"] += 1
+            return cached
+        guesses = np.concatenate([enc_c[idx[:LOOKAHEAD_SECOND_PLY]], enc_s])
+        codes = _pattern_codes_np(guesses, enc_c[idx]).astype(np.intp)
+        offsets = (np.arange(len(guesses), dtype=np.intp) * N_PATTERNS)[:, None]
+        counts = np.bincount((codes + offsets).ravel(), minlength=len(guesses) * N_PATTERNS).reshape(-1, N_PATTERNS)
+        counts[:, ALL_GREEN] = 0 # acertar no suma jugadas
+        value = 1.0 + float(((counts * leaf[counts]).sum(axis=1) / m).min())
+        memo[key] = value
+        return value
+
+    partitions = [_buckets(first[i]) for i in range(len(shortlist))]
+    one_ply = [1.0 + sum(len(b) * _leaf_cost(len(b)) for b in parts) / n for parts in partitions]
+    values = list(one_ply)
+    best = math.inf
+    # Las mas prometedoras primero: una buena cota temprana poda mas
+    for i in sorted(range(len(shortlist)), key=lambda i: one_ply[i]):
+        if time.perf_counter() >= deadline:
+            stats["complete"] = False
+            break
+        parts = sorted(partitions[i], key=len, reverse=True)
+        rest = sum(len(b) * _lower_bound(len(b)) for b in parts) / n
+        total = 1.0
+        for b in parts:
+            rest -= len(b) * _lower_bound(len(b)) / n
+            total += len(b) * second_ply(b) / n
+            if total + rest >= best:
+                break
+            if time.perf_counter() >= deadline:
+                stats["complete"] = False
+                break
+        else:
+            stats["expanded"] += 1
+            values[i] = total
+            best = min(best, total)
+            continue
+        stats["pruned"] += 1
+        values[i] = total + rest
+        bounded.add(shortlist[i])
+
+    ranked = [(w, bits, exp, values[i]) for i, (w, bits, exp) in enumerate(entries)]
+    ranked.sort(key=lambda t: (t[3], -t[1], t[2]))
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    stats["bounded"] = bounded
+    return ranked, stats
+
+# -------------------------
+# Libro de aperturas
+# -------------------------
+
+OPENING_BOOK_FILE = os.environ.get("WORDLE_OPENING_BOOK") or os.path.join(CACHE_DIR, "opening_book.json")
+BOOK_MAX_HISTORY = 1 # primera jugada y respuesta a cada feedback de la primera
+BOOK_DEPTH = 20 # entradas guardadas por posicion (= maximo de min(top_k * 2, 20))
+SCORING_VERSION = 3 # subir cuando cambie la forma de puntuar para invalidar libros viejos
+
+class OpeningBook:
+    """Tabla en disco de jugadas precalculadas para el inicio de la partida.
+
+    Las claves combinan la huella del diccionario y los parametros de puntuacion;
+    dentro de cada una, el historial (vacio o una jugada) apunta a la lista puntuada
+    que `_score_guesses` devolveria para esa posicion.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, dict]]] = None) -> None:
+        self.entries: Dict[str, Dict[str, dict]] = entries or {}
+
+    @staticmethod
+    def key(dictionary: Dictionary, approx_when_large: bool) -> str:
+        return f"{dictionary.digest}|approx={int(bool(approx_when_large))}|v={SCORING_VERSION}"
+
+    @staticmethod
+    def history_key(history: Sequence[Tuple[str, str]]) -> str:
+        return ",".join(f"{g}:{fb}" for g, fb in history)
+
+    @classmethod
+    def load(cls, path: str = OPENING_BOOK_FILE) -> "OpeningBook":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            log.warning("Libro de aperturas ilegible (%s): %s", path, e)
+            return cls()
+        return cls(data.get("entries", {}))
+
+    def save(self, path: str = OPENING_BOOK_FILE) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": SCORING_VERSION, "entries": self.entries}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def lookup(self, dictionary: Optional[Dictionary], approx_when_large: bool, history: Sequence[Tuple[str, str]]) -> Optional[dict]:
+        if dictionary is None or len(history) > BOOK_MAX_HISTORY:
+            return None
+        table = self.entries.get(self.key(dictionary, approx_when_large))
+        return table.get(self.history_key(history)) if table else None
+
+    def store(
+        self,
+        dictionary: Dictionary,
+        approx_when_large: bool,
+        history: Sequence[Tuple[str, str]],
+        scored: List[Tuple[str, float, float]],
+        evaluation: dict,
+    ) -> None:
+        table = self.entries.setdefault(self.key(dictionary, approx_when_large), {})
+        table[self.history_key(history)] = {
+            "scored": [[w, b, e] for w, b, e in scored[:BOOK_DEPTH]],
+            "evaluation": evaluation,
+        }
+
+_OPENING_BOOK: Optional[OpeningBook] = None
+_OPENING_BOOK_LOCK = threading.Lock()
+
+def _get_opening_book() -> OpeningBook:
+    """Libro de aperturas del proceso (se lee de disco una sola vez)."""
+    global _OPENING_BOOK
+    if _OPENING_BOOK is None:
+        with _OPENING_BOOK_LOCK:
+            if _OPENING_BOOK is None:
+                _OPENING_BOOK = OpeningBook.load()
+    return _OPENING_BOOK
+
+# -------------------------
+# Arbol de decision precalculado
+# -------------------------
+
+DECISION_TREE_DIR = os.environ.get("WORDLE_DECISION_TREE_DIR") or CACHE_DIR
+
+class DecisionTree:
+    """Arbol de decision completo (tools/build_decision_tree.py), mapeado con mmap.
+
+    Cada nodo guarda hasta `top_k` sugerencias del solver (indice en el diccionario, o
+    NO_GUESS si falta; la primera es la jugada que sigue el arbol) con sus bits y
+    candidatas esperadas, y sus aristas ordenadas por codigo de patron hacia el nodo
+    hijo. Cabecera `<8sIIIII20s` (magic, #nodos, #aristas, SCORING_VERSION, top_k,
+    parametros de `suggest_guess` con que se construyo, huella del diccionario); luego
+    guesses uint32[nodos * top_k], bits y esperadas float32[nodos * top_k], inicio de
+    aristas uint32[nodos + 1], hijos uint32[aristas] y codigos uint8[aristas].
+    Recorrerlo cuesta O(historial).
+    """
+
+    MAGIC = b"WDTR\x02\x00\x00\x00"
+    _HEADER = struct.Struct("<8sIIIII20s")
+    NO_GUESS = 0xFFFFFFFF
+    # Bits de `params`: las opciones de suggest_guess que cambian la jugada elegida
+    APPROX_WHEN_LARGE, EXACT, LOOKAHEAD = 1, 2, 4
+
+    def __init__(self, mm, n_nodes: int, n_edges: int, top_k: int, params: int, words: Sequence[str]) -> None:
+        self._mm = mm
+        self.n_nodes = n_nodes
+        self.n_edges = n_edges
+        self.top_k = top_k
+        self.params = params
+        self.words = words
+        self._guesses = self._HEADER.size
+        self._bits = self._guesses + 4 * n_nodes * top_k
+        self._remaining = self._bits + 4 * n_nodes * top_k
+        self._starts = self._remaining + 4 * n_nodes * top_k
+        self._children = self._starts + 4 * (n_nodes + 1)
+        self._codes = memoryview(mm)[self._children + 4 * n_edges:]
+
+    @staticmethod
+    def path_for(language: str, directory: str = DECISION_TREE_DIR) -> str:
+        return os.path.join(directory, f"decision_tree-{language}.wdtr")
+
+    @classmethod
+    def encode_params(cls, approx_when_large: bool, exact: bool, lookahead: bool) -> int:
+        return (
+            (cls.APPROX_WHEN_LARGE if approx_when_large else 0)
+            | (cls.EXACT if exact else 0)
+            | (cls.LOOKAHEAD if lookahead else 0)
+        )
+
+    def serves(self, top_k: int, approx_when_large: bool, exact: bool, lookahead: bool) -> bool:
+        """True si el arbol responde lo mismo que el calculo en vivo para estos parametros."""
+        return top_k <= self.top_k and self.params == self.encode_params(approx_when_large, exact, lookahead)
+
+    @classmethod
+    def write(
+        cls,
+        path: str,
+        dictionary: Dictionary,
+        nodes: Sequence[Tuple[Sequence[Tuple[int, float, float]], Sequence[Tuple[int, int]]]],
+        top_k: int,
+        params: int,
+    ) -> None:
+        """Escribe `nodes` = [([(indice, bits, esperadas), ...], [(codigo, hijo), ...])]; el nodo 0 es la raiz."""
+        guesses = bytearray()
+        bits = bytearray()
+        remaining = bytearray()
+        starts = bytearray()
+        children = bytearray()
+        codes = bytearray()
+        n_edges = 0
+        for suggestions, edges in nodes:
+            padded = list(suggestions[:top_k]) + [(cls.NO_GUESS, 0.0, 0.0)] * (top_k - len(suggestions))
+            for guess, b, rem in padded:
+                guesses += struct.pack("<I", guess)
+                bits += struct.pack("<f", b)
+                remaining += struct.pack("<f", rem)
+            starts += struct.pack("<I", n_edges)
+            for code, child in sorted(edges):
+                children += struct.pack("<I", child)
+                codes.append(code)
+                n_edges += 1
+        starts += struct.pack("<I", n_edges)
+        header = cls._HEADER.pack(
+            cls.MAGIC, len(nodes), n_edges, SCORING_VERSION, top_k, params, bytes.fromhex(dictionary.digest)
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(header + bytes(guesses) + bytes(bits) + bytes(remaining) + bytes(starts) + bytes(children) + bytes(codes))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, dictionary: Dictionary) -> Optional["DecisionTree"]:
+        """Mapea el arbol; None si falta, esta corrupto o es de otro diccionario o version."""
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mm) < cls._HEADER.size:
+            return None
+        magic, n_nodes, n_edges, version, top_k, params, digest = cls._HEADER.unpack_from(mm, 0)
+        if (
+            magic != cls.MAGIC
+            or version != SCORING_VERSION
+            or digest.hex() != dictionary.digest
+            or top_k < 1
+            or len(mm) != cls._HEADER.size + 12 * n_nodes * top_k + 4 * (n_nodes + 1) + 5 * n_edges
+        ):
+            return None
+        return cls(mm, n_nodes, n_edges, top_k, params, dictionary.words)
+
+    def _u32(self, base: int, i: int) -> int:
+        return struct.unpack_from("<I", self._mm, base + 4 * i)[0]
+
+    def _f32(self, base: int, i: int) -> float:
+        return struct.unpack_from("<f", self._mm, base + 4 * i)[0]
+
+    def lookup(self, history: Sequence[Tuple[str, str]]) -> Optional[List[Tuple[str, float, float]]]:
+        """Sugerencias [(word, bits, esperadas)] del arbol tras `history`; None si la partida salio del arbol."""
+        node = 0
+        for guess, fb in history:
+            g = self._u32(self._guesses, node * self.top_k)
+            if g == self.NO_GUESS or self.words[g] != guess:
+                return None
+            lo, hi = self._u32(self._starts, node), self._u32(self._starts, node + 1)
+            code = _pattern_to_code(fb)
+            i = bisect.bisect_left(self._codes, code, lo, hi)
+            if i == hi or self._codes[i] != code:
+                return None
+            node = self._u32(self._children, i)
+        suggestions = []
+        for slot in range(node * self.top_k, (node + 1) * self.top_k):
+            g = self._u32(self._guesses, slot)
+            if g == self.NO_GUESS:
+                break
+            suggestions.append((self.words[g], self._f32(self._bits, slot), self._f32(self._remaining, slot)))
+        return suggestions or None
+
+_DECISION_TREES: Dict[str, Optional[DecisionTree]] = {}
+
+def _get_decision_tree(dictionary: Dictionary) -> Optional[DecisionTree]:
+    """Arbol del diccionario (se mapea una sola vez); None si no hay uno vigente."""
+    key = dictionary.digest
+    if key not in _DECISION_TREES:
+        _DECISION_TREES[key] = DecisionTree.load(DecisionTree.path_for(dictionary.language), dictionary)
+    return _DECISION_TREES[key]
+
+# -------------------------
+# Cache de sugerencias
+# -------------------------
+
+class TTLCache:
+    """Cache LRU acotada con expiracion por TTL y contadores de aciertos/fallos/desalojos."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[object, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: object) -> Optional[object]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, value = item
+            if self.ttl_seconds and now - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: object, value: object) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+SUGGEST_CACHE_SIZE = int(os.environ.get("WORDLE_SUGGEST_CACHE_SIZE", "1024"))
+SUGGEST_CACHE_TTL = float(os.environ.get("WORDLE_SUGGEST_CACHE_TTL", "3600"))
+_SUGGEST_CACHE = TTLCache(SUGGEST_CACHE_SIZE, SUGGEST_CACHE_TTL)
+
+def _suggest_cache_key(
+    candidates: CandidateSet,
+    guess_pool: CandidateSet,
+    game_phase: str,
+    top_k: int,
+    approx_when_large: bool,
+    exact: bool = False,
+    budget_ms: Optional[float] = None,
+    deadline_ms: Optional[float] = None,
+) -> tuple:
+    return (
+        candidates.fingerprint(),
+        guess_pool.fingerprint(),
+        game_phase,
+        top_k,
+        bool(approx_when_large),
+        bool(exact),
+        budget_ms if exact else None,
+        deadline_ms or None,
+        SCORING_VERSION,
+    )
+
+# -------------------------
+# Solver exacto de final de partida
+# -------------------------
+
+ENDGAME_THRESHOLD = int(os.environ.get("WORDLE_ENDGAME_MAX", "15")) # candidatas por debajo de las cuales se resuelve exacto
+ENDGAME_BUDGET_MS = float(os.environ.get("WORDLE_ENDGAME_MS", "250"))
+ENDGAME_MEMO_SIZE = int(os.environ.get("WORDLE_ENDGAME_MEMO", "50000"))
+_ENDGAME_MEMO = TTLCache(ENDGAME_MEMO_SIZE, 0) # solo valores exactos; no expiran
+_EPS = 1e-9
+
+_ENCODED: Dict[str, object] = {} # digest -> diccionario codificado (N, 5)
+
+def _encoded_dictionary(dictionary: Dictionary):
+    """`_encode_words` del diccionario completo, calculado una vez por version."""
+    enc = _ENCODED.get(dictionary.digest)
+    if enc is None:
+        enc = _ENCODED[dictionary.digest] = _encode_words(dictionary.words)
+    return enc
+
+class _EndgameSearch:
+    """Busqueda exhaustiva de la politica optima para un conjunto chico de candidatas S.
+
+    El valor de un subconjunto es el minimo, sobre las guesses del pool, de
+    1 + sum(|b| / m * V(b)) por cada cubo b no acertado (V(1) = 1, V(2) = 1.5); a igual
+    esperanza decide el peor caso. Los patrones de S se calculan al crear la busqueda y
+    los de una palabra por clase de equivalencia del pool (letras ausentes de S son
+    intercambiables) la primera vez que hacen falta, por bloques y dentro del plazo; los
+    subconjuntos son tuplas de posiciones en S. Fuera del subconjunto nada baja de 2
+    jugadas, asi que el resto de S y el pool solo se miran si ninguna candidata llega a
+    eso, y toda guess se ordena y poda por la cota `3 - cubos/m`.
+    """
+
+    REP_BLOCK = 1024 # clases del pool por bloque de patrones
 
-def _entropy_for_guess(guess: str, answers: List[str]) -> Tuple[float, float]:
-    """Retorna (entropia bits, expected_remaining) para `guess` dado el conjunto actual de respuestas."""
-    n = len(answers)
-    if n == 0:
-        return 0.0, 0.0
-        
-    buckets: Dict[str, int] = defaultdict(int)
-    for ans in answers:
-        p = _pattern(guess, ans)
-        buckets[p] += 1
-    
-    H = 0.0
-    exp_rem = 0.0
-    for cnt in buckets.values():
-        if cnt > 0:
-            p = cnt / n
-            H -= p * math.log2(p)
-            exp_rem += p * cnt
-    return H, exp_rem
+    def __init__(self, candidate_set: CandidateSet, pool_set: CandidateSet, deadline: float) -> None:
+        self.deadline = deadline
+        self.dictionary = candidate_set.dictionary
+        self.indices = candidate_set.indices()
+        self.own = _encoded_dictionary(self.dictionary)[self.indices]
+        self.codes = _pattern_codes_np(self.own, self.own)
+        self.pool_set = pool_set
+        self.pool_key = pool_set.fingerprint()
+        self.reps = None # indices del diccionario; se calculan en `_pool_guesses`
+        self.rep_codes = None
+        self.pool_complete = False
+        self.stats = {"pool_classes": 0, "nodes": 0, "memo_hits": 0, "pruned": 0}
 
-def _best_by_entropy(
-    guess_pool: List[str],
-    answers: List[str],
-    top_k: int = 5,
-    sample_answers: Optional[int] = None,
-    limit_guess_pool: Optional[int] = None,
-) -> List[Tuple[str, float, float]]:
-    """Evalua entropia para cada palabra del pool."""
-    if not guess_pool or not answers:
-        return []
-        
-    answers_eval = answers
-    if sample_answers and len(answers) > sample_answers:
-        step = max(1, len(answers) // sample_answers)
-        answers_eval = answers[::step][:sample_answers]
+    def late(self) -> bool:
+        return time.perf_counter() >= self.deadline
 
-    pool = guess_pool[:limit_guess_pool] if limit_guess_pool else guess_pool
+    def _pool_guesses(self) -> bool:
+        """Calcula (una vez) los representantes del pool y sus patrones; False si el plazo lo dejo a medias."""
+        if self.reps is not None:
+            return self.pool_complete
+        enc = _encoded_dictionary(self.dictionary)
+        pool = np.fromiter(self.pool_set.indices(), dtype=np.intp)
+        lut = np.full(26, 26, dtype=np.int64)
+        present = np.unique(self.own)
+        lut[present] = present
+        weights = 27 ** np.arange(5, dtype=np.int64)
+        keys, first = np.unique(lut[enc[pool]] @ weights, return_index=True)
+        # Las clases de las candidatas ya estan en `codes`
+        reps = pool[np.sort(first[~np.isin(keys, lut[self.own] @ weights)])]
+        blocks = []
+        done = 0
+        while done < len(reps) and not self.late():
+            blocks.append(_pattern_codes_np(enc[reps[done:done + self.REP_BLOCK]], self.own))
+            done += len(blocks[-1])
+        self.reps = reps[:done]
+        self.rep_codes = np.concatenate(blocks) if blocks else np.zeros((0, len(self.indices)), dtype=np.uint8)
+        self.pool_complete = done == len(reps)
+        self.stats["pool_classes"] = done
+        return self.pool_complete
 
-    scores: List[Tuple[str, float, float]] = []
-    for w in pool:
-        bits, exp_rem = _entropy_for_guess(w, answers_eval)
-        scores.append((w, bits, exp_rem))
+    def value(self, sub: Tuple[int, ...]) -> Tuple[float, int, bool]:
+        """(jugadas esperadas, peor caso, exacto) para resolver el subconjunto `sub`."""
+        m = len(sub)
+        if m == 1:
+            return 1.0, 1, True
+        if m == 2:
+            return 1.5, 2, True
+        key = (self.pool_key, tuple(self.indices[p] for p in sub))
+        cached = _ENDGAME_MEMO.get(key)
+        if cached is not None:
+            self.stats["memo_hits"] += 1
+            return cached
+        options, exact = self.options(sub)
+        exp, worst, _, _ = options[0]
+        if exact:
+            _ENDGAME_MEMO.put(key, (exp, worst, True))
+        return exp, worst, exact
 
-    # Orden: bits desc, expected_remaining asc
-    scores.sort(key=lambda t: (-t[1], t[2]))
-    return scores[:top_k]
+    def options(self, sub: Tuple[int, ...], keep_bounds: bool = False) -> Tuple[List[tuple], bool]:
+        """Guesses valoradas [(esperadas, peor caso, indice, completa)] ordenadas y si el valor es exacto.
 
-def _get_diverse_words(words: List[str], candidates: List[str], limit: Optional[int] = None) -> List[str]:
-    """Selecciona palabras con letras diversas para early game."""
-    if not words or not candidates:
-        return words
-    
-    # Contar frecuencia de letras en candidatos
-    letter_freq = defaultdict(int)
-    for word in candidates:
-        for char in set(word):  # Contar cada letra solo una vez por palabra
-            letter_freq[char] += 1
-    
-    # Puntuar palabras por diversidad y frecuencia de letras
-    word_scores = []
-    for word in words:
-        unique_letters = len(set(word))
-        freq_score = sum(letter_freq.get(char, 0) for char in set(word))
-        # Penalizar letras repetidas, premiar letras comunes
-        diversity_score = unique_letters * 2 + freq_score / len(candidates) if candidates else unique_letters
-        word_scores.append((word, diversity_score))
-    
-    # Ordenar por puntaje y tomar los mejores
-    word_scores.sort(key=lambda x: -x[1])
-    selected = [w for w, _ in word_scores[:limit or len(word_scores)]]
-    
-    return selected
+        La primera siempre esta valorada por completo. Con `keep_bounds` tambien se
+        devuelven las candidatas podadas, con su cota inferior y `completa=False`.
+        Pasado el plazo cada nodo se queda con la primera guess (politica voraz).
+        """
+        self.stats["nodes"] += 1
+        m = len(sub)
+        cols = list(sub)
+        codes = self.codes[np.ix_(cols, cols)]
+        groups = _count_groups(codes) - 1 # sin el cubo de acierto
+        bounds = 1.0 + (2 * (m - 1) - groups) / m
+        results: List[tuple] = []
+        best = (math.inf, math.inf)
+        exact = True
+        order = np.argsort(bounds, kind="stable")
+        for k, i in enumerate(order):
+            late = bool(results) and self.late()
+            if late or bounds[i] > best[0] + _EPS:
+                exact = exact and not late
+                self.stats["pruned"] += len(order) - k
+                if keep_bounds:
+                    results += [(float(bounds[r]), 0, self.indices[sub[r]], False) for r in order[k:]]
+                break
+            if not keep_bounds and _cannot_improve(bounds[i], groups[i] == m - 1, best):
+                continue
+            exp, worst, sub_exact, complete = self._evaluate(sub, codes[i], best[0])
+            if complete:
+                exact &= sub_exact
+                best = min(best, (exp, worst))
+            if complete or keep_bounds:
+                results.append((exp, worst, self.indices[sub[i]], complete))
 
-def _rerank_suggestions(
-    scored: List[Tuple[str, float, float]], 
-    candidates: List[str], 
-    phase: str, 
-    attempts: int
-) -> List[Tuple[str, float, float]]:
-    """Reordena sugerencias considerando la fase del juego."""
-    if phase == "end" and len(candidates) <= 5:
-        # En end game con pocas opciones, priorizar candidatos reales
-        candidates_set = set(candidates)
-        candidate_suggestions = [(w, b, e) for w, b, e in scored if w in candidates_set]
-        non_candidate_suggestions = [(w, b, e) for w, b, e in scored if w not in candidates_set]
-        
-        # Si hay candidatos con buena entropía, ponerlos primero
-        if candidate_suggestions:
-            candidate_suggestions.sort(key=lambda x: (-x[1], x[2]))
-            non_candidate_suggestions.sort(key=lambda x: (-x[1], x[2]))
-            return candidate_suggestions + non_candidate_suggestions
-    
-    # Para otras fases, mantener orden por entropía
-    return scored
+        # Fuera del subconjunto nada baja de 2 jugadas: solo se mira el resto si no se llego a eso.
+        # El resto son las demas candidatas de S (ya descartadas en este subconjunto) y el pool.
+        if best[0] >= 2.0 - _EPS and self.late():
+            exact = False
+        elif best[0] >= 2.0 - _EPS:
+            exact &= self._pool_guesses()
+            inside = set(sub)
+            outside = [r for r in range(len(self.indices)) if r not in inside]
+            rep_codes = np.concatenate([self.codes[np.ix_(outside, cols)], self.rep_codes[:, cols]])
+            rep_ids = [self.indices[r] for r in outside] + self.reps.tolist()
+            groups = _count_groups(rep_codes)
+            bounds = 3.0 - groups / m
+            useful = np.flatnonzero((bounds <= best[0] + _EPS) & (groups > 1))
+            seen = set()
+            for j in useful[np.argsort(bounds[useful], kind="stable")]:
+                if bounds[j] > best[0] + _EPS:
+                    break
+                if self.late():
+                    exact = False
+                    break
+                if _cannot_improve(bounds[j], groups[j] == m, best):
+                    continue
+                row = rep_codes[j]
+                signature = row.tobytes()
+                if signature in seen:
+                    continue # misma particion que una ya evaluada
+                seen.add(signature)
+                exp, worst, sub_exact, complete = self._evaluate(sub, row, best[0])
+                if complete:
+                    exact &= sub_exact
+                    best = min(best, (exp, worst))
+                    results.append((exp, worst, int(rep_ids[j]), True))
+        # Primero las valoradas; a igual valor, una candidata (puede acertar) y el orden del diccionario
+        own = {self.indices[p] for p in sub}
+        results.sort(key=lambda t: (not t[3], round(t[0], 9), t[1], t[2] not in own, t[2]))
+        return results, exact
 
-def _analyze_remaining_candidates(candidates: List[str], history: List[Tuple[str, str]]) -> dict:
-    """Analiza los candidatos restantes para dar insights útiles."""
-    n = len(candidates)
-    if n == 0:
-        return {"count": 0, "message": "No quedan candidatos válidos"}
-    
-    if n == 1:
-        return {
-            "count": 1, 
-            "message": f"¡Solo queda un candidato: '{candidates[0]}'!",
-            "final_answer": candidates[0]
-        }
-    
-    # Analizar letras comunes en posiciones específicas
-    position_letters = [defaultdict(int) for _ in range(5)]
-    for word in candidates:
-        for i, char in enumerate(word):
-            position_letters[i][char] += 1
-    
-    # Encontrar posiciones más/menos determinadas
-    position_entropy = []
-    for i, pos_counts in enumerate(position_letters):
-        if not pos_counts:
-            continue
-        total = sum(pos_counts.values())
-        entropy = -sum((count/total) * math.log2(count/total) for count in pos_counts.values() if count > 0)
-        position_entropy.append((i, entropy, pos_counts))
-    
-    analysis = {
-        "count": n,
-        "message": f"Quedan {n} candidatos posibles",
+    def _evaluate(self, sub: Tuple[int, ...], codes_row, cutoff: float) -> Tuple[float, int, bool, bool]:
+        """(esperadas, peor caso, exacto, completa) de una guess con patrones `codes_row` sobre `sub`.
+
+        Si no puede bajar de `cutoff` se corta y lo devuelto es una cota inferior (completa=False).
+        """
+        m = len(sub)
+        buckets: Dict[int, List[int]] = {}
+        for p, code in zip(sub, codes_row.tolist()):
+            if code != ALL_GREEN:
+                buckets.setdefault(code, []).append(p)
+        parts = sorted(buckets.values(), key=len, reverse=True)
+        rest = sum(2 * len(b) - 1 for b in parts) / m
+        total, worst, exact = 1.0, 1, True
+        for b in parts:
+            rest -= (2 * len(b) - 1) / m
+            exp, w, sub_exact = self.value(tuple(b))
+            total += len(b) * exp / m
+            worst = max(worst, 1 + w)
+            exact &= sub_exact
+            if total + rest > cutoff + _EPS:
+                self.stats["pruned"] += 1
+                return total + rest, 0, exact, False
+        return total, worst, exact, True
+
+def _count_groups(codes):
+    """Patrones distintos por fila de `codes` (cubos no vacios de cada guess)."""
+    ordered = np.sort(codes, axis=1)
+    return 1 + np.count_nonzero(np.diff(ordered, axis=1), axis=1)
+
+def _cannot_improve(bound: float, singletons: bool, best: Tuple[float, float]) -> bool:
+    """True si una guess con cota `bound` a lo sumo empata la esperanza sin mejorar el peor caso."""
+    worst_at_least = 2 if singletons else 3
+    return bound >= best[0] - _EPS and worst_at_least >= best[1]
+
+def _solve_endgame(
+    candidate_set: CandidateSet,
+    pool_set: CandidateSet,
+    budget_ms: float = ENDGAME_BUDGET_MS,
+) -> Optional[Tuple[List[Tuple[str, float, int]], dict]]:
+    """Jugadas optimas para pocas candidatas: [(word, esperadas, peor caso)] y estadisticas.
+
+    Todas las candidatas quedan valoradas (alternativas) junto con las guesses del pool
+    que las superan. Agotado `budget_ms` ya no se recorre el pool y el resultado se
+    marca `exact: False`. Devuelve None si hace falta NumPy y no esta.
+    """
+    started = time.perf_counter()
+    deadline = started + budget_ms / 1000.0 # la preparacion tambien consume el plazo
+    words = candidate_set.dictionary.words
+    subset = candidate_set.indices()
+    if len(subset) <= 2:
+        value = 1.0 if len(subset) == 1 else 1.5
+        options, exact, stats = [(value, len(subset), i, True) for i in subset], True, {}
+    elif np is None:
+        return None
+    else:
+        search = _EndgameSearch(candidate_set, pool_set, deadline)
+        options, exact = search.options(tuple(range(len(subset))), keep_bounds=True)
+        stats = search.stats
+    ranked = [(words[i], exp, worst if complete else None) for exp, worst, i, complete in options]
+    stats = {
+        "exact": exact,
+        "expected_guesses": round(ranked[0][1], 4),
+        "worst_case": ranked[0][2],
+        "guesses_evaluated": len(ranked),
+        **stats,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
     }
-    
-    if n <= 20:
-        analysis["candidates_list"] = candidates[:20]  # Limitar para evitar spam
-    
-    if position_entropy:
-        position_entropy.sort(key=lambda x: x[1])  # Menos entropía = más determinada
-        
-        most_determined = position_entropy[0]
-        if most_determined[1] < 1.0:  # Entropía baja = posición casi determinada
-            pos, _, letters = most_determined
-            most_common = max(letters.items(), key=lambda x: x[1])
-            analysis["most_likely_position"] = {
-                "position": pos + 1,
-                "letter": most_common[0],
-                "probability": round(most_common[1] / n, 2)
-            }
-        
-        if len(position_entropy) > 1:
-            least_determined = position_entropy[-1]
-            if least_determined[1] > 2.0:  # Entropía alta = mucha incertidumbre
-                pos, _, letters = least_determined
-                analysis["most_uncertain_position"] = {
-                    "position": pos + 1,
-                    "possible_letters": len(letters),
-                    "top_letters": sorted(letters.items(), key=lambda x: -x[1])[:3]
-                }
-    
-    return analysis
+    return ranked, stats
 
 # ------------------------------------------------------------
 # Servidor MCP (FastMCP) y herramientas
@@ -326,63 +2928,287 @@ def _analyze_remaining_candidates(candidates: List[str], history: List[Tuple[str
 mcp = FastMCP("wordle-solver")
 
 @mcp.tool()
+@_logged
 def reset_session(session: str = "default", language: str = "es") -> dict:
-    """Reinicia la sesion con el diccionario indicado ("es" o "en")."""
-    st = _ensure_session(session, language)
-    st.language = language
-    words = _make_wordlist(language)
-    st.candidates = words.copy()
-    st.guess_pool = words.copy()
-    st.history.clear()
+    """Reinicia la sesion con el diccionario indicado ("es", "en" u otro idioma de wordfreq)."""
+    with _log_stage("session"):
+        st = _ensure_session(session, language)
+    fresh = _new_session_state(language)
+    with st.lock:
+        st.language = fresh.language
+        st.dictionary = fresh.dictionary
+        st.candidates = fresh.candidates
+        st.guess_pool = fresh.guess_pool
+        st.history.clear()
+        _persist_session(session, st)
+    _SESSIONS.account(session)
     
-    print(f"[DEBUG] Sesión {session} reiniciada: {len(st.candidates)} palabras cargadas", file=sys.stderr)
+    log.debug("Sesión reiniciada: %d palabras cargadas", len(fresh.candidates))
     
     return {
         "session": session,
-        "language": language,
-        "candidates": len(st.candidates),
-        "guess_pool": len(st.guess_pool),
+        "language": fresh.language,
+        "candidates": len(fresh.candidates),
+        "guess_pool": len(fresh.guess_pool),
     }
 
 @mcp.tool()
-def apply_feedback(session: str, guess: str, feedback: str) -> dict:
-    """Aplica feedback a la sesion."""
-    st = _ensure_session(session)
+@_logged
+def apply_feedback(
+    session: str,
+    guess: str,
+    feedback: str,
+    history: Optional[List[List[str]]] = None,
+    state_token: Optional[str] = None,
+    language: str = "es",
+) -> dict:
+    """Aplica feedback a la sesion.
+
+    Sin estado: si llega `history` ([[guess, feedback], ...]) o `state_token`, se parte de
+    ese historial en lugar de la sesion del servidor y se devuelve el nuevo `state_token`.
+    """
+    with _log_stage("session"):
+        st, stateless = _resolve_session(session, history, state_token, language)
     g = _norm(guess)
     if not ALPHA_RE.match(g):
         raise ValueError("guess invalido: usa 5 letras a-z")
     
     fb = _coerce_feedback(feedback)
-    before = len(st.candidates)
-    
-    print(f"[DEBUG] Aplicando feedback: {g} -> {fb}, candidatos antes: {before}", file=sys.stderr)
-    
-    st.candidates = _filter_by_feedback(st.candidates, g, fb)
-    st.history.append((g, fb))
-    after = len(st.candidates)
+    (row,), snap = _apply_rows(session, st, stateless, [(g, fb)])
+    before, after = row["candidates_before"], row["candidates_after"]
     
-    print(f"[DEBUG] Candidatos después: {after} (reducción: {before - after})", file=sys.stderr)
-    if after <= 10:
-        print(f"[DEBUG] Candidatos restantes: {st.candidates}", file=sys.stderr)
-    
-    return {
+    result = {
         "session": session,
         "applied": {"guess": g, "feedback": fb},
         "candidates_before": before,
         "candidates_after": after,
         "narrowed": before - after,
     }
+    if stateless:
+        result["state_token"] = _encode_state_token(snap[0], snap[4], snap[3])
+    return result
+
+def _snapshot(st: SessionState) -> tuple:
+    """(idioma, candidatas, pool, historial, diccionario); llamar con `st.lock` tomado."""
+    return st.language, st.candidates, st.guess_pool, list(st.history), st.dictionary
+
+def _apply_rows(
+    session: str,
+    st: SessionState,
+    stateless: bool,
+    rows: Sequence[Tuple[str, str]],
+) -> Tuple[List[dict], tuple]:
+    """Aplica filas (guess, feedback) ya validadas bajo un solo lock; persiste una vez.
+
+    Devuelve el resumen de cada fila y un snapshot del estado resultante, de modo que
+    quien sugiere a continuacion no tenga que volver a buscar ni bloquear la sesion.
+    """
+    applied: List[dict] = []
+    with st.lock, _scoring_dictionary(st.dictionary):
+        for g, fb in rows:
+            before = len(st.candidates)
+            with _log_stage("filter"):
+                st.candidates = _filter_candidates(st.candidates, g, fb)
+            st.history.append((g, fb))
+            applied.append({"guess": g, "feedback": fb, "candidates_before": before, "candidates_after": len(st.candidates)})
+        if not stateless:
+            with _log_stage("persist"):
+                _persist_session(session, st)
+        snap = _snapshot(st)
+    if not stateless:
+        _SESSIONS.account(session)
+    
+    if log.isEnabledFor(logging.DEBUG):
+        for row in applied:
+            log.debug("Feedback aplicado: %s -> %s", row["guess"], row["feedback"], extra={"fields": {
+                "candidates_before": row["candidates_before"], "candidates_after": row["candidates_after"],
+            }})
+        if applied and applied[-1]["candidates_after"] <= 10:
+            log.debug("Candidatos restantes", extra={"fields": {"candidates": list(snap[1].words())}})
+    return applied, snap
 
 @mcp.tool()
+@_logged
 def suggest_guess(
     session: str = "default",
     top_k: int = 5,
     approx_when_large: bool = True,
     debug: bool = False,
+    exact: bool = False,
+    budget_ms: Optional[int] = None,
+    deadline_ms: Optional[int] = None,
+    lookahead: bool = False,
+    use_tree: bool = False,
+    history: Optional[List[List[str]]] = None,
+    state_token: Optional[str] = None,
+    language: str = "es",
+) -> dict:
+    """Sugiere la mejor jugada por entropía considerando el historial y optimizando estrategia.
+
+    Con `exact=True` evalua el pool completo contra todas las candidatas (sin muestreo);
+    `budget_ms` (por defecto WORDLE_EXACT_MS, 5000 ms) limita esa evaluacion y, si no alcanza,
+    el resultado se marca como aproximado: la apertura sobre el diccionario completo no cabe.
+    Con `deadline_ms` se puntua de la guess mas prometedora a la menos y se devuelve lo mejor
+    encontrado al vencer el plazo; `evaluation` indica que parte del pool se evaluo.
+    Con `lookahead=True` (hasta WORDLE_LOOKAHEAD_MAX candidatas) la shortlist se ordena por
+    jugadas esperadas hasta resolver, mirando dos jugadas (`expected_guesses`); con `deadline_ms`
+    la puntuacion usa la mitad del plazo y el lookahead lo que queda.
+    Con `use_tree=True` la jugada sale del arbol de decision precalculado si la partida
+    sigue en el arbol y este se construyo con las mismas opciones (`approx_when_large`,
+    `exact`, `lookahead` y al menos `top_k` sugerencias); si no, se calcula en vivo.
+    Sin estado: `history` o `state_token` reemplazan a la sesion del servidor.
+    """
+    started = time.perf_counter() # `deadline_ms` cuenta desde aqui
+    with _log_stage("session"):
+        st, stateless = _resolve_session(session, history, state_token, language)
+    with st.lock:
+        snap = _snapshot(st)
+    with _scoring_dictionary(snap[4]):
+        return _suggest_from_snapshot(
+            session, snap, stateless, top_k, approx_when_large, debug, exact, budget_ms, deadline_ms, lookahead,
+            use_tree, started,
+        )
+
+@mcp.tool()
+@_logged
+def apply_and_suggest(
+    session: str = "default",
+    feedback: Optional[List[List[str]]] = None,
+    top_k: int = 5,
+    approx_when_large: bool = True,
+    debug: bool = False,
+    exact: bool = False,
+    budget_ms: Optional[int] = None,
+    deadline_ms: Optional[int] = None,
+    lookahead: bool = False,
+    use_tree: bool = False,
+    history: Optional[List[List[str]]] = None,
+    state_token: Optional[str] = None,
+    language: str = "es",
+) -> dict:
+    """Aplica una o mas filas de feedback ([[guess, feedback], ...]) y devuelve la siguiente sugerencia.
+
+    Equivale a `apply_feedback` por fila seguido de `suggest_guess`, en una sola llamada y
+    sobre las candidatas que deja el filtrado. Acepta los mismos parametros que `suggest_guess`.
+    El ahorro es un viaje de ida y vuelta y una toma del lock: la sugerencia parte del snapshot
+    del filtrado, pero el filtrado es por mascaras (no arma cubos de patrones), asi que la
+    puntuacion calcula sus particiones igual que `suggest_guess`.
+    Si las filas dejan 0 candidatas, quedan aplicadas igual y se devuelve `applied` con
+    `best: None` y `alternatives` vacia.
+    """
+    started = time.perf_counter() # `deadline_ms` cuenta desde aqui
+    rows = _coerce_history(feedback or [], "feedback")
+    with _log_stage("session"):
+        st, stateless = _resolve_session(session, history, state_token, language)
+    applied, snap = _apply_rows(session, st, stateless, rows)
+    language, candidate_set, _, applied_history, dictionary = snap
+    if len(candidate_set) == 0:
+        # Las filas ya quedaron aplicadas: se informa el efecto en vez de fallar, como `apply_feedback`,
+        # para que el cliente no las reintente y duplique el historial
+        result = {
+            "session": session,
+            "candidates": 0,
+            "best": None,
+            "alternatives": [],
+            "candidates_analysis": _analyze_remaining_candidates([], applied_history),
+            "history": applied_history,
+            "applied": applied,
+        }
+        if stateless:
+            result["state_token"] = _encode_state_token(language, dictionary, applied_history)
+        return result
+    with _scoring_dictionary(dictionary):
+        result = _suggest_from_snapshot(
+            session, snap, stateless, top_k, approx_when_large, debug, exact, budget_ms, deadline_ms, lookahead,
+            use_tree, started,
+        )
+    result["applied"] = applied
+    return result
+
+@mcp.tool()
+@_logged
+async def suggest_guess_progressive(
+    session: str = "default",
+    top_k: int = 5,
+    approx_when_large: bool = True,
+    exact: bool = False,
+    budget_ms: Optional[int] = None,
+    deadline_ms: Optional[int] = None,
+    lookahead: bool = False,
+    use_tree: bool = False,
+    history: Optional[List[List[str]]] = None,
+    state_token: Optional[str] = None,
+    language: str = "es",
+    partial_results: bool = True,
+    ctx: Optional[Context] = None,
+) -> dict:
+    """`suggest_guess` con notificaciones de progreso MCP mientras recorre el pool.
+
+    Si la peticion trae progressToken se reportan los pares evaluados; con `partial_results`
+    ademas se envia el top-k provisional como mensaje de log. Cancelar la peticion corta
+    la puntuacion en el siguiente bloque.
+    """
+    loop = asyncio.get_running_loop()
+
+    def emit(done: int, total: int, best: List[Tuple[str, float, float]]) -> None:
+        if ctx is None:
+            return
+        lead = f" · mejor hasta ahora: {best[0][0]} ({best[0][1]:.2f} bits)" if best else ""
+        asyncio.run_coroutine_threadsafe(_report_progress(ctx, done, total, f"{done}/{total} pares{lead}"), loop)
+        if partial_results and best:
+            partial = [{"word": w, "entropy_bits": round(b, 4), "expected_remaining": round(e, 2)} for w, b, e in best]
+            asyncio.run_coroutine_threadsafe(ctx.info(json.dumps({"session": session, "best_so_far": partial})), loop)
+
+    progress = ScoringProgress(emit, top_k)
+    token = _SCORING_PROGRESS.set(progress)
+    try:
+        result = await _run_heavy(
+            suggest_guess,
+            session=session,
+            top_k=top_k,
+            approx_when_large=approx_when_large,
+            exact=exact,
+            budget_ms=budget_ms,
+            deadline_ms=deadline_ms,
+            lookahead=lookahead,
+            use_tree=use_tree,
+            history=history,
+            state_token=state_token,
+            language=language,
+        )
+    except asyncio.CancelledError:
+        progress.cancel()
+        raise
+    finally:
+        _SCORING_PROGRESS.reset(token)
+    total = max(progress.total, 1)
+    if ctx is not None and progress.reported < total:
+        await _report_progress(ctx, total, total, "listo")
+    return result
+
+def _suggest_from_snapshot(
+    session: str,
+    snap: tuple,
+    stateless: bool,
+    top_k: int = 5,
+    approx_when_large: bool = True,
+    debug: bool = False,
+    exact: bool = False,
+    budget_ms: Optional[int] = None,
+    deadline_ms: Optional[int] = None,
+    lookahead: bool = False,
+    use_tree: bool = False,
+    started: Optional[float] = None,
 ) -> dict:
-    """Sugiere la mejor jugada por entropía considerando el historial y optimizando estrategia."""
-    st = _ensure_session(session)
-    n = len(st.candidates)
+    """Cuerpo de `suggest_guess` sobre un snapshot ya tomado (ver `_snapshot`).
+
+    `started` es el perf_counter de entrada a la herramienta; `deadline_ms` cuenta desde ahi.
+    """
+    if started is None:
+        started = time.perf_counter()
+    language, candidate_set, pool_set, history, dictionary = snap
+    n = len(candidate_set)
+    candidates = candidate_set.words()
     
     if n == 0:
         raise ValueError("No hay candidatas; reinicia la sesión o revisa feedbacks previos")
@@ -390,62 +3216,109 @@ def suggest_guess(
     # Debug info
     debug_info = {}
     if debug:
-        debug_info["candidates_sample"] = st.candidates[:10] if n <= 10 else st.candidates[:5] + ["..."] + st.candidates[-5:]
-        debug_info["guess_pool_size"] = len(st.guess_pool)
-        debug_info["history_count"] = len(st.history)
+        debug_info["candidates_sample"] = list(candidates[:10]) if n <= 10 else [*candidates[:5], "...", *candidates[-5:]]
+        debug_info["guess_pool_size"] = len(pool_set)
+        debug_info["history_count"] = len(history)
     
     # Determinar fase del juego
-    attempts = len(st.history)
-    game_phase = "early" if attempts <= 1 else "mid" if attempts <= 3 else "end"
-    
-    print(f"[DEBUG] Fase: {game_phase}, intentos: {attempts}, candidatos: {n}", file=sys.stderr)
-    
-    # Heurísticas de rendimiento adaptativas
-    sample_answers = None
-    limit_guesses = None
-    if approx_when_large:
-        if n > 1000:
-            sample_answers = min(2000, max(500, n // 2))
-        if len(st.guess_pool) > 2000:
-            limit_guesses = min(3000, max(1000, len(st.guess_pool) // 2))
-    
-    # Usar un subset del guess pool para acelerar
-    guess_pool_to_use = st.guess_pool
+    attempts = len(history)
+    game_phase = _game_phase(attempts)
     
-    # Estrategia por fase de juego
-    if game_phase == "early":
-        # Early game: priorizar palabras con letras diferentes y comunes
-        guess_pool_to_use = _get_diverse_words(st.guess_pool, st.candidates, limit_guesses)
-        print(f"[DEBUG] Early game: usando {len(guess_pool_to_use)} palabras diversas", file=sys.stderr)
-    elif game_phase == "end" and n <= 10:
-        # End game: priorizar candidatos reales
-        candidate_guesses = [w for w in st.candidates if w in st.guess_pool]
-        if candidate_guesses:
-            # Evaluar candidatos + algunas palabras de alta entropía
-            top_entropy = _best_by_entropy(
-                st.guess_pool[:500],
-                st.candidates,
-                top_k=10,
-                sample_answers=sample_answers,
-            )
-            top_entropy_words = [w for w, _, _ in top_entropy]
-            guess_pool_to_use = list(set(candidate_guesses + top_entropy_words))
-            print(f"[DEBUG] End game: {len(candidate_guesses)} candidatos + {len(top_entropy_words)} alta entropía", file=sys.stderr)
+    log.debug("Fase: %s, intentos: %d, candidatos: %d", game_phase, attempts, n)
     
-    # Calcular entropías
-    scored = _best_by_entropy(
-        guess_pool_to_use,
-        st.candidates,
-        top_k=min(top_k * 2, 20),
-        sample_answers=sample_answers,
-        limit_guess_pool=limit_guesses,
-    )
+    # Apertura: consultar el libro precalculado antes de calcular en vivo
+    score_k = min(top_k * 2, 20)
+    use_lookahead = lookahead and np is not None and 2 < n <= LOOKAHEAD_MAX_CANDIDATES
+    # Con lookahead y plazo, la puntuacion anytime deja parte del plazo al lookahead
+    score_deadline_ms = deadline_ms * LOOKAHEAD_DEADLINE_SHARE if deadline_ms and use_lookahead else deadline_ms
+    book_entry = None
+    tree_scored = None
+    if use_tree:
+        with _log_stage("tree"):
+            tree = _get_decision_tree(dictionary)
+            # Solo si se construyo con las mismas opciones; si no, la jugada podria diferir
+            if tree is not None and tree.serves(top_k, approx_when_large, exact, lookahead):
+                tree_scored = tree.lookup(history)
+    # Pocas candidatas: solver exacto de final (en cualquier fase)
+    endgame = None
+    if tree_scored is None and n <= ENDGAME_THRESHOLD:
+        if deadline_ms:
+            remaining_ms = deadline_ms - (time.perf_counter() - started) * 1000.0
+            budget = max(0.0, min(ENDGAME_BUDGET_MS, remaining_ms))
+        else:
+            budget = ENDGAME_BUDGET_MS
+        with _log_stage("endgame"):
+            endgame = _solve_endgame(candidate_set, pool_set, budget)
+    if attempts <= BOOK_MAX_HISTORY and not exact and tree_scored is None and endgame is None:
+        with _log_stage("book"):
+            book_entry = _get_opening_book().lookup(dictionary, approx_when_large, history)
+    if tree_scored is not None:
+        scored = tree_scored
+        evaluation = {"exact": False, "guesses_evaluated": 0, "answers_evaluated": n, "decision_tree": True}
+        log.debug("Jugada servida desde el arbol de decision (%d jugadas)", len(history))
+    elif endgame is not None:
+        options, stats = endgame
+        scored = [(w, *_entropy_for_guess(w, candidates)) for w, _, _ in options[:score_k]]
+        evaluation = {
+            "exact": stats["exact"],
+            "guesses_evaluated": stats["guesses_evaluated"],
+            "answers_evaluated": n,
+            "endgame": stats,
+        }
+        log.debug("Final exacto: %d candidatas", n, extra={"fields": {"exact": stats["exact"], "nodes": stats.get("nodes", 0)}})
+    elif book_entry is not None:
+        scored = [(w, b, e) for w, b, e in book_entry["scored"][:score_k]]
+        evaluation = dict(book_entry["evaluation"])
+        log.debug("Apertura servida desde el libro (%d jugadas)", len(history))
+    else:
+        cache_key = _suggest_cache_key(
+            candidate_set, pool_set, game_phase, score_k, approx_when_large, exact, budget_ms, score_deadline_ms
+        )
+        cached = _SUGGEST_CACHE.get(cache_key)
+        if cached is not None:
+            scored, evaluation = cached
+            scored, evaluation = list(scored), dict(evaluation)
+        else:
+            with _log_stage("score"):
+                scored, evaluation = _score_guesses(
+                    candidate_set, pool_set, game_phase, score_k, approx_when_large, exact, budget_ms,
+                    score_deadline_ms, started,
+                )
+            _SUGGEST_CACHE.put(cache_key, (tuple(scored), dict(evaluation)))
     
     if not scored:
         raise ValueError("No se encontraron conjeturas válidas")
     
-    # Post-procesamiento: reordenar considerando la fase del juego
-    final_suggestions = _rerank_suggestions(scored, st.candidates, game_phase, attempts)
+    # Post-procesamiento: reordenar por jugadas esperadas (lookahead) o segun la fase del juego
+    lookahead_budget = LOOKAHEAD_BUDGET_MS
+    if use_lookahead and deadline_ms:
+        # Lo que queda del plazo, menos el analisis de candidatas que arma la respuesta
+        remaining_ms = deadline_ms - (time.perf_counter() - started) * 1000.0
+        remaining_ms -= _estimated_analysis_seconds(n) * 1000.0
+        lookahead_budget = min(LOOKAHEAD_BUDGET_MS, remaining_ms)
+    expected_guesses: Dict[str, float] = {}
+    worst_case: Dict[str, Optional[int]] = {}
+    bounded = set()
+    if endgame is not None:
+        # El solver ya ordena por jugadas esperadas y peor caso
+        expected_guesses = {w: exp for w, exp, _ in options}
+        worst_case = {w: worst for w, _, worst in options}
+        bounded = {w for w, _, worst in options if worst is None}
+        final_suggestions = scored
+    elif tree_scored is not None:
+        # El arbol guarda las sugerencias ya reordenadas
+        final_suggestions = scored
+    elif use_lookahead and lookahead_budget > 0:
+        with _log_stage("lookahead"):
+            ranked, stats = _lookahead_rank(candidate_set, scored, lookahead_budget)
+        bounded = stats.pop("bounded")
+        evaluation["lookahead"] = stats
+        expected_guesses = {w: eg for w, _, _, eg in ranked}
+        final_suggestions = [(w, b, e) for w, b, e, _ in ranked]
+    else:
+        if use_lookahead:
+            evaluation["lookahead"] = {"skipped_by_deadline": True}
+        final_suggestions = _rerank_suggestions(scored, candidate_set, game_phase, attempts)
     
     # Tomar solo top_k
     final_suggestions = final_suggestions[:top_k]
@@ -470,9 +3343,23 @@ def suggest_guess(
         f"{phase_explanations[game_phase]}. '{best_word}' maximiza la información esperada "
         f"(≈{best_bits:.2f} bits), reduciendo en promedio a ≈{best_exp:.1f} candidatos.{strategy_note}"
     )
+    if endgame is not None:
+        explanation = (
+            f"{phase_explanations[game_phase]}. Con {n} candidatos el solver de final recorre todo el pool: "
+            f"'{best_word}' minimiza las jugadas esperadas (≈{expected_guesses[best_word]:.2f}, "
+            f"peor caso {worst_case[best_word]}).{strategy_note}"
+        )
+    elif expected_guesses:
+        explanation = (
+            f"{phase_explanations[game_phase]}. Mirando dos jugadas, '{best_word}' minimiza las jugadas "
+            f"esperadas hasta resolver (≈{expected_guesses[best_word]:.2f}) con ≈{best_bits:.2f} bits.{strategy_note}"
+        )
     
     # Análisis de candidatos restantes
-    candidates_analysis = _analyze_remaining_candidates(st.candidates, st.history)
+    with _log_stage("analysis"):
+        t0 = time.perf_counter()
+        candidates_analysis = _analyze_remaining_candidates(candidates, history)
+        _record_analysis_cost(n, time.perf_counter() - t0)
     
     result = {
         "session": session,
@@ -483,41 +3370,100 @@ def suggest_guess(
             "word": best_word, 
             "entropy_bits": round(best_bits, 4), 
             "expected_remaining": round(best_exp, 2),
-            "is_candidate": best_word in st.candidates
+            "is_candidate": best_word in candidate_set
         },
         "alternatives": [
             {
                 "word": w, 
                 "entropy_bits": round(b, 4), 
                 "expected_remaining": round(er, 2),
-                "is_candidate": w in st.candidates
+                "is_candidate": w in candidate_set
             }
             for (w, b, er) in final_suggestions
         ],
         "explanation": explanation,
         "candidates_analysis": candidates_analysis,
-        "history": st.history,
+        "evaluation": evaluation,
+        "history": history,
     }
+    if expected_guesses:
+        for entry in [result["best"], *result["alternatives"]]:
+            # Las podadas solo tienen cota inferior: se sabe que no mejoran a la mejor
+            key = "expected_guesses_at_least" if entry["word"] in bounded else "expected_guesses"
+            entry[key] = round(expected_guesses[entry["word"]], 3)
+            if worst_case.get(entry["word"]) is not None:
+                entry["worst_case_guesses"] = worst_case[entry["word"]]
+    if stateless:
+        result["state_token"] = _encode_state_token(language, dictionary, history)
     
     if debug:
         result["debug"] = debug_info
-        result["debug"]["guess_pool_used"] = len(guess_pool_to_use)
+        result["debug"]["guess_pool_used"] = evaluation["guesses_evaluated"]
+        result["debug"]["opening_book"] = book_entry is not None
+        result["debug"]["endgame"] = endgame is not None
+        if use_tree:
+            result["debug"]["decision_tree"] = tree_scored is not None
     
     return result
 
 @mcp.tool()
-def state(session: str = "default") -> dict:
-    """Devuelve el estado actual (idioma, #candidatas, historial)."""
-    st = _ensure_session(session)
-    return {
-        "session": session,
-        "language": st.language,
-        "candidates": len(st.candidates),
-        "guess_pool": len(st.guess_pool),
-        "history": st.history,
-    }
+@_logged
+def state(
+    session: str = "default",
+    history: Optional[List[List[str]]] = None,
+    state_token: Optional[str] = None,
+    language: str = "es",
+) -> dict:
+    """Devuelve el estado actual (idioma, #candidatas, historial); sin estado con `history`/`state_token`."""
+    with _log_stage("session"):
+        st, stateless = _resolve_session(session, history, state_token, language)
+    with st.lock:
+        result = {
+            "session": session,
+            "language": st.language,
+            "candidates": len(st.candidates),
+            "guess_pool": len(st.guess_pool),
+            "history": list(st.history),
+        }
+    if stateless:
+        result["state_token"] = _encode_state_token(st.language, st.dictionary, st.history)
+    return result
+
+@mcp.tool()
+@_logged
+def cache_stats(clear: bool = False) -> dict:
+    """Estadisticas de la cache de sugerencias y de la memo del final (aciertos, fallos, desalojos); `clear` las vacia."""
+    stats = {"suggest_cache": _SUGGEST_CACHE.stats(), "endgame_memo": _ENDGAME_MEMO.stats()}
+    if clear:
+        _SUGGEST_CACHE.clear()
+        _ENDGAME_MEMO.clear()
+    return stats
+
+@mcp.tool()
+@_logged
+def session_stats() -> dict:
+    """Sesiones vivas y desalojadas, memoria aproximada por sesion y limites configurados."""
+    return {"sessions": _SESSIONS.stats()}
 
 @mcp.tool()
+@_logged
+def metrics(reset: bool = False) -> dict:
+    """Llamadas, errores, throughput y latencia (media, p50/p95/p99) por herramienta y por etapa; `reset` las reinicia."""
+    snapshot = _METRICS.snapshot()
+    if reset:
+        _METRICS.reset()
+    return snapshot
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Las mismas metricas en formato de texto de Prometheus (transportes HTTP)."""
+    return PlainTextResponse(_METRICS.prometheus(), media_type="text/plain; version=0.0.4")
+
+# Las versiones de mcp sin rutas HTTP propias solo exponen la herramienta `metrics`
+if hasattr(mcp, "custom_route"):
+    mcp.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+
+@mcp.tool()
+@_logged
 def whoami() -> dict:
     """Información del servidor y diccionario."""
     try:
@@ -532,11 +3478,13 @@ def whoami() -> dict:
         "pid": os.getpid(),
         "wordlist_file": WORDLIST_FILE,
         "wordlist_head": head,
+        "languages_loaded": {lang: len(d.words) for lang, d in list(_DICTIONARIES.items())},
         "version": "2.0 - Optimizada con estrategia adaptativa"
     }
 
 # Función de scraping simplificada (mantener la original si es necesaria)
 @mcp.tool()
+@_logged
 def scrape_board(session: str, url: str, **kwargs) -> dict:
     """Funcionalidad de scraping simplificada."""
     return {
@@ -546,6 +3494,76 @@ def scrape_board(session: str, url: str, **kwargs) -> dict:
         "candidates": len(_ensure_session(session).candidates),
     }
 
+# -------------------------
+# Ejecucion de herramientas pesadas fuera del event loop
+# -------------------------
+
+# "inline": las herramientas corren en el event loop (comportamiento original).
+# "thread": el cuerpo de cada herramienta pesada corre en un ThreadPoolExecutor.
+# "process": igual que "thread", pero la puntuacion se reparte ademas en el pool
+#            de procesos (EntropyPool); el estado de sesion vive en este proceso.
+# "auto": inline en stdio, thread en sse/http (se resuelve con _resolve_executor_mode).
+EXECUTOR_MODE = os.environ.get("WORDLE_EXECUTOR", "auto")
+MAX_HEAVY = int(os.environ.get("WORDLE_MAX_HEAVY", "4")) # calculos pesados simultaneos
+HEAVY_TOOLS = ("reset_session", "apply_feedback", "suggest_guess", "apply_and_suggest")
+
+_HEAVY_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_HEAVY_SEMAPHORE: Optional[asyncio.Semaphore] = None
+
+async def _run_heavy(fn, *args, **kwargs):
+    """Ejecuta `fn` en el executor, con a lo sumo MAX_HEAVY ejecuciones a la vez."""
+    global _HEAVY_SEMAPHORE
+    if _HEAVY_SEMAPHORE is None:
+        _HEAVY_SEMAPHORE = asyncio.Semaphore(MAX_HEAVY)
+    async with _HEAVY_SEMAPHORE:
+        ctx = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_HEAVY_EXECUTOR, functools.partial(ctx.run, fn, *args, **kwargs))
+
+def _offloaded(fn):
+    """Variante async de la herramienta `fn` que delega el trabajo en el executor."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await _run_heavy(fn, *args, **kwargs)
+    return wrapper
+
+def _resolve_executor_mode(mode: str, transport: str = "stdio") -> str:
+    """Traduce "auto" al modo concreto para `transport`: inline en stdio, thread en sse/http."""
+    if mode == "auto":
+        return "inline" if transport == "stdio" else "thread"
+    return mode
+
+def _configure_executor(mode: str, max_heavy: int = MAX_HEAVY, workers: int = 0, transport: str = "stdio") -> None:
+    """Re-registra las herramientas pesadas como async segun `mode` (auto/inline/thread/process)."""
+    global EXECUTOR_MODE, MAX_HEAVY, _HEAVY_EXECUTOR, _HEAVY_SEMAPHORE
+    mode = _resolve_executor_mode(mode, transport)
+    if mode not in ("inline", "thread", "process"):
+        raise ValueError(f"executor invalido: {mode} (usa inline, thread o process)")
+    EXECUTOR_MODE = mode
+    MAX_HEAVY = max(1, max_heavy)
+    _HEAVY_SEMAPHORE = None
+    if _HEAVY_EXECUTOR is not None:
+        _HEAVY_EXECUTOR.shutdown(wait=False)
+        _HEAVY_EXECUTOR = None
+    if mode != "inline":
+        _HEAVY_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_HEAVY, thread_name_prefix="wordle-heavy")
+    if mode == "process":
+        _start_entropy_pool(workers if workers > 1 else max(2, MAX_HEAVY))
+
+    remove = getattr(mcp, "remove_tool", None)
+    for name in HEAVY_TOOLS:
+        fn = globals()[name]
+        if remove is not None:
+            remove(name)
+        else: # pragma: no cover - versiones de mcp sin remove_tool
+            mcp._tool_manager._tools.pop(name, None)
+        mcp.add_tool(fn if mode == "inline" else _offloaded(fn), name=name, description=fn.__doc__)
+
+# Al importar no se conoce el transporte; se asume stdio, y __main__ reconfigura
+# con el transporte real.
+if _resolve_executor_mode(EXECUTOR_MODE) != "inline":
+    _configure_executor(EXECUTOR_MODE, MAX_HEAVY, ENTROPY_WORKERS)
+
 if __name__ == "__main__":
     import argparse
     
@@ -557,11 +3575,65 @@ if __name__ == "__main__":
         choices=["stdio", "sse", "streamable-http"],
         help="Transporte MCP (por defecto: stdio)",
     )
+    parser.add_argument(
+        "--pattern-matrix",
+        action="store_true",
+        default=PATTERN_MATRIX_ENABLED,
+        help="Precalcula (o carga de .cache/) la matriz guess x answer de patrones",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=ENTROPY_WORKERS,
+        help="Procesos para evaluar entropia en paralelo (0/1 = un solo nucleo)",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["auto", "inline", "thread", "process"],
+        default=os.environ.get("WORDLE_EXECUTOR", "auto"),
+        help="Donde corren las herramientas pesadas (auto: inline en stdio, thread en sse/http)",
+    )
+    parser.add_argument(
+        "--max-heavy",
+        type=int,
+        default=MAX_HEAVY,
+        help="Maximo de calculos pesados simultaneos con --executor thread/process",
+    )
+    parser.add_argument(
+        "--log-level",
+        default=LOG_LEVEL,
+        help="Nivel de log (DEBUG, INFO, WARNING...); DEBUG traza cada llamada con sus etapas",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        default=LOG_FORMAT,
+        help="Formato de los logs en stderr: texto o una linea JSON por registro",
+    )
+    parser.add_argument(
+        "--log-sample",
+        type=float,
+        default=LOG_SAMPLE,
+        help="Fraccion de llamadas cuyos logs DEBUG/INFO se emiten (los WARNING siempre)",
+    )
+    parser.add_argument(
+        "--sessions-db",
+        default=SESSIONS_DB,
+        help="Archivo SQLite donde persistir las partidas entre reinicios (vacio = solo en memoria)",
+    )
     args = parser.parse_args()
+
+    _configure_logging(args.log_level, args.log_format, args.log_sample)
+    if args.pattern_matrix:
+        PATTERN_MATRIX_ENABLED = True  # los demas idiomas la cargan al primer uso
+        _load_pattern_matrix(_get_dictionary())
+    if args.workers > 1:
+        _start_entropy_pool(args.workers)
+    if args.sessions_db != SESSIONS_DB:
+        _configure_session_backend(args.sessions_db)
+    _configure_executor(args.executor, args.max_heavy, args.workers, args.transport)
     
     # Ejecuta el servidor MCP
-    print(f"[WORDLE_LOCAL] PID={os.getpid()} FILE={__file__}", file=sys.stderr, flush=True)
-    print(f"[WORDLE_LOCAL] WORDLIST_FILE={WORDLIST_FILE}", file=sys.stderr, flush=True)
-    print(f"[WORDLE_LOCAL] Versión optimizada cargada", file=sys.stderr, flush=True)
+    log.info("Servidor iniciado", extra={"fields": {"pid": os.getpid(), "file": __file__, "wordlist_file": WORDLIST_FILE}})
     
     mcp.run(transport=args.transport)
\ No newline at end of file
@@ -0,0 +1,190 @@
+# tools/bench_solver.py
+# Benchmarks reproducibles de las rutas calientes del solver sobre word.txt:
+# latencia (p50/p95/p99), throughput y memoria pico por etapa y por tamaño de
+# diccionario, mas un modo de simulacion de partidas completas.
+#
+#   python3 tools/bench_solver.py                       # etapas, tamaños 1k,10k,30k,full
+#   python3 tools/bench_solver.py --sizes 1000 --repeat 20
+#   python3 tools/bench_solver.py --games 50 --sizes 30000
+#
+# Los mismos casos corren como pruebas de regresion: python3 -m pytest tools/test_bench_solver.py
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import server  # noqa: E402
+
+STAGES = ("pattern", "filter", "filter_index", "entropy", "best", "diverse", "roundtrip")
+
+@contextlib.contextmanager
+def quiet():
+    """Sube el log del servidor a WARNING durante las mediciones y restaura la configuracion al salir."""
+    saved = (server.LOG_LEVEL, server.LOG_FORMAT, server.LOG_SAMPLE)
+    server._configure_logging("WARNING", saved[1], saved[2])
+    try:
+        yield
+    finally:
+        server._configure_logging(*saved)
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def measure(fn, repeat, ops_per_call=1):
+    """Ejecuta `fn` `repeat` veces; una pasada extra bajo tracemalloc mide la memoria pico."""
+    with quiet():
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+    total = sum(samples)
+    return {
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "ops_per_s": round(repeat * ops_per_call / total, 1) if total else None,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+def make_dictionary(size, all_words):
+    """Registra un diccionario de `size` palabras (prefijo de word.txt) con un idioma propio."""
+    words = all_words if size is None else all_words[:size]
+    lang = f"bench-{len(words)}"
+    d = server._build_dictionary(lang, words)
+    server._DICTIONARIES[lang] = d
+    return d
+
+def stage_cases(d, rng):
+    """Devuelve {etapa: (fn, ops_por_llamada)} sobre el diccionario `d`."""
+    words = list(d.words)
+    full = server.CandidateSet.full(d)
+    guess = rng.choice(words)
+    answer = rng.choice(words)
+    feedback = server._pattern(guess, answer)
+    pairs = [(rng.choice(words), rng.choice(words)) for _ in range(1000)]
+    # Mismas heuristicas que suggest_guess con approx_when_large=True
+    sample = min(2000, max(500, len(words) // 2)) if len(words) > 1000 else None
+    limit = min(3000, max(1000, len(words) // 2)) if len(words) > 2000 else None
+    session = f"bench-{len(words)}"
+
+    def roundtrip():
+        server.reset_session(session, d.language)
+        server.apply_feedback(session, guess, feedback)
+        server.suggest_guess(session)
+
+    return {
+        "pattern": (lambda: [server._pattern(g, a) for g, a in pairs], len(pairs)),
+        "filter": (lambda: server._filter_by_feedback(words, guess, feedback), 1),
+        "filter_index": (lambda: server._filter_candidates(full, guess, feedback), 1),
+        "entropy": (lambda: server._entropy_for_guess(guess, words), 1),
+        "best": (lambda: server._best_by_entropy(words, words, top_k=10, sample_answers=sample, limit_guess_pool=limit), 1),
+        "diverse": (lambda: server._get_diverse_words(words, words, limit), 1),
+        "roundtrip": (roundtrip, 1),
+    }
+
+def bench_stages(d, stages, repeat, rng):
+    cases = stage_cases(d, rng)
+    results = {}
+    for stage in stages:
+        fn, ops = cases[stage]
+        # Las etapas lentas se repiten menos para mantener el tiempo total acotado
+        reps = repeat if stage in ("pattern", "filter_index") else max(3, repeat // 5)
+        results[stage] = measure(fn, reps, ops)
+        print(f"  {stage:<13} {results[stage]}")
+    return results
+
+def simulate(d, games, rng, max_turns):
+    """Juega `games` partidas contra respuestas aleatorias y resume calidad y tiempo."""
+    words = list(d.words)
+    turns = []
+    walls = []
+    failures = 0
+    with quiet():
+        for g in range(games):
+            session = f"sim-{g}"
+            answer = rng.choice(words)
+            server.reset_session(session, d.language)
+            t0 = time.perf_counter()
+            solved = False
+            for turn in range(1, max_turns + 1):
+                best = server.suggest_guess(session)["best"]["word"]
+                if best == answer:
+                    solved = True
+                    break
+                server.apply_feedback(session, best, server._pattern(best, answer))
+            walls.append(time.perf_counter() - t0)
+            if solved:
+                turns.append(turn)
+            else:
+                failures += 1
+            server._SESSIONS.pop(session)
+    return {
+        "games": games,
+        "solved": len(turns),
+        "failed": failures,
+        "avg_guesses": round(statistics.fmean(turns), 3) if turns else None,
+        "max_guesses": max(turns) if turns else None,
+        "within_6": sum(1 for t in turns if t <= 6),
+        "avg_wall_ms": round(statistics.fmean(walls) * 1000, 1),
+        "p95_wall_ms": round(percentile(walls, 0.95) * 1000, 1),
+    }
+
+def parse_sizes(text):
+    return [None if s.strip() in ("full", "all") else int(s) for s in text.split(",") if s.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del MCP Wordle Solver")
+    parser.add_argument("--sizes", default="1000,10000,30000,full", help="tamaños de diccionario ('full' = word.txt completo)")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"etapas a medir ({', '.join(STAGES)})")
+    parser.add_argument("--repeat", type=int, default=50, help="repeticiones de las etapas rapidas")
+    parser.add_argument("--games", type=int, default=0, help="partidas a simular por tamaño (0 = no simular)")
+    parser.add_argument("--max-turns", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-caches", action="store_true", help="mantiene libro de aperturas y cache de sugerencias")
+    parser.add_argument("--json", help="escribe los resultados en este archivo")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"etapas desconocidas: {', '.join(sorted(unknown))}")
+
+    if not args.with_caches:
+        server._OPENING_BOOK = server.OpeningBook()
+        server._SUGGEST_CACHE.max_entries = 0
+
+    with quiet():
+        all_words = server._make_wordlist(max_words=10**9)
+    report = {"numpy": server.np is not None, "word_count": len(all_words), "sizes": {}}
+    for size in parse_sizes(args.sizes):
+        rng = random.Random(args.seed)
+        d = make_dictionary(size, all_words)
+        print(f"== {len(d.words)} palabras ==")
+        entry = {"stages": bench_stages(d, stages, args.repeat, rng) if stages else {}}
+        if args.games:
+            entry["simulation"] = simulate(d, args.games, rng, args.max_turns)
+            print(f"  simulation    {entry['simulation']}")
+        report["sizes"][str(len(d.words))] = entry
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Guardado en: {args.json}")
+
+if __name__ == "__main__":
+    main()
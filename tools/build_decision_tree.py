@@ -0,0 +1,64 @@
+# tools/build_decision_tree.py
+# Construye el arbol de decision completo del solver: en cada nodo, la jugada que
+# suggest_guess elegiria para ese historial y un hijo por cada feedback posible,
+# hasta resolver todas las palabras del diccionario.
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import server  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Construye el arbol de decision del solver")
+parser.add_argument("--language", default="es")
+parser.add_argument("--output", help="por defecto .cache/decision_tree-<idioma>.wdtr")
+parser.add_argument("--max-depth", type=int, default=10, help="jugadas maximas por rama (mas alla, calculo en vivo)")
+parser.add_argument("--top-k", type=int, default=5, help="sugerencias guardadas por nodo (sirve peticiones con top_k <= este)")
+parser.add_argument("--no-approx", action="store_true", help="construye con approx_when_large=False")
+parser.add_argument("--exact", action="store_true", help="construye con exact=True")
+parser.add_argument("--lookahead", action="store_true", help="construye con lookahead=True")
+parser.add_argument("--quiet", action="store_true", help="Solo muestra avisos y errores del servidor (log WARNING)")
+args = parser.parse_args()
+
+if args.quiet:
+    server._configure_logging("WARNING")
+
+d = server._get_dictionary(args.language)
+output = args.output or server.DecisionTree.path_for(d.language)
+
+t0 = time.time()
+options = {"top_k": args.top_k, "approx_when_large": not args.no_approx, "exact": args.exact, "lookahead": args.lookahead}
+# nodes[i] = ([(indice, bits, esperadas)], [(codigo, hijo)]); los hijos se numeran al encolarlos
+nodes = [None]
+queue = deque([(0, [], list(d.words))])
+while queue:
+    node, history, candidates = queue.popleft()
+    if len(history) >= args.max_depth:
+        nodes[node] = ([], [])
+        continue
+    # La misma ruta que una peticion real (libro, cache, puntuacion y reordenado)
+    result = server.suggest_guess("decision-tree", history=[list(h) for h in history], language=d.language, **options)
+    best = result["best"]["word"]
+    buckets = defaultdict(list)
+    for ans in candidates:
+        buckets[server._pattern(best, ans)].append(ans)
+    edges = []
+    for fb, members in sorted(buckets.items()):
+        # Si la jugada no separa nada el hijo repetiria el nodo: se deja al calculo en vivo
+        if fb == "GGGGG" or len(members) == len(candidates):
+            continue
+        child = len(nodes)
+        nodes.append(None)
+        edges.append((server._pattern_to_code(fb), child))
+        queue.append((child, history + [(best, fb)], members))
+    suggestions = [(d.index[a["word"]], a["entropy_bits"], a["expected_remaining"]) for a in result["alternatives"]]
+    nodes[node] = (suggestions, edges)
+    if len(nodes) % 1000 < len(edges):
+        print(f"{len(nodes)} nodos, {len(queue)} pendientes, {time.time() - t0:.0f}s", file=sys.__stdout__, flush=True)
+
+params = server.DecisionTree.encode_params(options["approx_when_large"], options["exact"], options["lookahead"])
+server.DecisionTree.write(output, d, nodes, args.top_k, params)
+print(f"{len(nodes)} nodos en {time.time() - t0:.1f}s", file=sys.__stdout__)
+print(f"Guardado en: {output}", file=sys.__stdout__)
@@ -0,0 +1,52 @@
+# tools/build_opening_book.py
+# Precalcula el libro de aperturas: mejores primeras jugadas y, para la mejor,
+# la respuesta a cada feedback posible de la primera jugada.
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import server  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Construye el libro de aperturas del solver")
+parser.add_argument("--language", default="es")
+parser.add_argument("--output", default=server.OPENING_BOOK_FILE)
+parser.add_argument(
+    "--exact",
+    action="store_true",
+    help="Tambien precalcula approx_when_large=False (lento: evalua el diccionario completo)",
+)
+parser.add_argument("--quiet", action="store_true", help="Solo muestra avisos y errores del servidor (log WARNING)")
+args = parser.parse_args()
+
+if args.quiet:
+    server._configure_logging("WARNING")
+
+d = server._get_dictionary(args.language)
+full = server.CandidateSet.full(d)
+book = server.OpeningBook.load(args.output)
+
+for approx in ([True, False] if args.exact else [True]):
+    t0 = time.time()
+    scored, evaluation = server._score_guesses(full, full, server._game_phase(0), server.BOOK_DEPTH, approx)
+    book.store(d, approx, [], scored, evaluation)
+    first = scored[0][0]
+
+    # Cada feedback posible de `first` define las candidatas del segundo turno
+    buckets = defaultdict(int)
+    for ans in d.words:
+        buckets[server._pattern(first, ans)] += 1
+    for fb in sorted(buckets):
+        history = [(first, fb)]
+        cands = server._filter_candidates(full, first, fb)
+        scored2, evaluation2 = server._score_guesses(cands, full, server._game_phase(1), server.BOOK_DEPTH, approx)
+        book.store(d, approx, history, scored2, evaluation2)
+    print(
+        f"approx={approx}: apertura '{first}', {len(buckets)} respuestas precalculadas en {time.time() - t0:.1f}s",
+        file=sys.__stdout__,
+    )
+
+book.save(args.output)
+print(f"Guardado en: {args.output}", file=sys.__stdout__)
@@ -0,0 +1,43 @@
+# tools/check_filters.py
+# Verificacion diferencial: el filtrado por ConstraintIndex debe coincidir
+# exactamente con filtrar por `_pattern` (incluidas letras repetidas y
+# feedbacks imposibles).
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import server  # noqa: E402
+
+server._configure_logging("WARNING")  # solo avisos y errores del servidor
+
+parser = argparse.ArgumentParser(description="Compara ConstraintIndex contra _pattern")
+parser.add_argument("--cases", type=int, default=2000, help="pares (guess, feedback) a probar")
+parser.add_argument("--subset", type=int, default=3000, help="tamaño del conjunto de candidatas")
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
+
+rng = random.Random(args.seed)
+d = server._get_dictionary()
+words = list(d.words)
+# Palabras con letras repetidas primero: son los casos delicados
+repeated = [w for w in words if len(set(w)) < 5]
+
+failures = 0
+for case in range(args.cases):
+    guess = rng.choice(repeated if case % 2 else words)
+    subset = rng.sample(words, min(args.subset, len(words)))
+    if case % 3 == 2:
+        feedback = "".join(rng.choice("GYK") for _ in range(5))  # posiblemente imposible
+    else:
+        feedback = server._pattern(guess, rng.choice(subset))
+    expected = server._filter_by_feedback(subset, guess, feedback)
+    cs = server.CandidateSet.from_words(d, subset)
+    got = list(cs & server.CandidateSet(d, d.constraints.mask_for(guess, feedback)))
+    if sorted(got) != sorted(expected):
+        failures += 1
+        print(f"DIFF guess={guess} feedback={feedback}: index={len(got)} pattern={len(expected)}")
+
+print(f"Casos: {args.cases}  Diferencias: {failures}")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,47 @@
+# tools/compile_dictionary.py
+# Compila word.txt (y opcionalmente las frecuencias de es_full.txt) en el binario
+# que el servidor mapea con mmap al arrancar, sin volver a normalizar el texto.
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import server  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="Compila el diccionario a formato binario (mmap)")
+parser.add_argument("--input", default=server.WORDLIST_FILE)
+parser.add_argument("--freq", default=os.path.join(HERE, "es_full.txt"), help="archivo 'palabra frecuencia'")
+parser.add_argument("--no-freq", action="store_true", help="no incluye frecuencias")
+parser.add_argument("--output", default=server.COMPILED_DICT_FILE)
+args = parser.parse_args()
+
+t0 = time.time()
+words = server._parse_wordlist(args.input)
+
+freqs = None
+if not args.no_freq and os.path.exists(args.freq):
+    # Varias formas (con tilde, mayusculas) normalizan a la misma palabra: se suman
+    freqs = defaultdict(int)
+    with open(args.freq, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 2 or len(parts[0]) != 5:
+                continue
+            w = server._norm(parts[0])
+            if server.ALPHA_RE.match(w):
+                try:
+                    freqs[w] += int(parts[1])
+                except ValueError:
+                    continue
+
+server.CompiledDictionary.write(args.output, words, server._file_sha1(args.input), freqs)
+compiled = server.CompiledDictionary.load(args.output)
+print(
+    f"{compiled.n} palabras, frecuencias={'si' if freqs is not None else 'no'}, "
+    f"{os.path.getsize(args.output) / 1024:.0f} KB en {time.time() - t0:.1f}s"
+)
+print(f"Guardado en: {args.output}")
@@ -0,0 +1,85 @@
+# tools/stress_sessions.py
+# Prueba de estres de los locks por sesion: muchos hilos mezclan apply_feedback,
+# state y suggest_guess sobre una misma sesion. Al final de cada ronda, reaplicar
+# el historial guardado debe reconstruir exactamente el CandidateSet de la sesion,
+# y cada `state` leido a mitad debe ser coherente con su propio historial.
+import argparse
+import os
+import random
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import server  # noqa: E402
+
+server._configure_logging("WARNING")  # solo avisos y errores del servidor durante la prueba
+
+parser = argparse.ArgumentParser(description="Estres de una sesion desde muchos hilos")
+parser.add_argument("--threads", type=int, default=32)
+parser.add_argument("--ops", type=int, default=20, help="operaciones por hilo y ronda")
+parser.add_argument("--rounds", type=int, default=5)
+parser.add_argument("--session", default="stress")
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
+
+rng = random.Random(args.seed)
+d = server._get_dictionary()
+words = list(d.words)
+
+failures = []
+applied = 0
+applied_lock = threading.Lock()
+
+def worker(seed: int, secret: str, start: threading.Barrier) -> None:
+    global applied
+    trng = random.Random(seed)
+    start.wait()
+    for _ in range(args.ops):
+        op = trng.random()
+        try:
+            if op < 0.5:
+                # Feedback coherente con `secret`: la sesion nunca se queda sin candidatas
+                guess = trng.choice(words)
+                server.apply_feedback(args.session, guess, server._pattern(guess, secret))
+                with applied_lock:
+                    applied += 1
+            elif op < 0.8:
+                st = server.state(args.session)
+                expected = len(server._replay_history(d, [tuple(h) for h in st["history"]]))
+                if st["candidates"] != expected:
+                    failures.append(f"state incoherente: {st['candidates']} candidatas, historial da {expected}")
+            else:
+                server.suggest_guess(args.session, top_k=3)
+        except Exception as e:  # noqa: BLE001 - cualquier error cuenta como fallo
+            failures.append(f"{type(e).__name__}: {e}")
+
+for rnd in range(args.rounds):
+    secret = rng.choice(words)
+    server.reset_session(args.session)
+    applied = 0
+    start = threading.Barrier(args.threads)
+    threads = [
+        threading.Thread(target=worker, args=(rng.random(), secret, start)) for _ in range(args.threads)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    st = server._SESSIONS.get(args.session)
+    with st.lock:
+        history = list(st.history)
+        stored = st.candidates
+    replayed = server._replay_history(d, history)
+    if len(history) != applied:
+        failures.append(f"ronda {rnd}: {applied} feedbacks aplicados, {len(history)} en el historial")
+    if replayed.indices() != stored.indices():
+        failures.append(f"ronda {rnd}: el historial da {len(replayed)} candidatas, la sesion guarda {len(stored)}")
+    if secret not in stored:
+        failures.append(f"ronda {rnd}: la respuesta {secret} desaparecio de las candidatas")
+    print(f"Ronda {rnd}: {len(history)} feedbacks, {len(stored)} candidatas")
+
+for f in failures[:20]:
+    print(f"FALLO {f}")
+print(f"Hilos: {args.threads}  Rondas: {args.rounds}  Fallos: {len(failures)}")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,33 @@
+# tools/test_apply_and_suggest.py
+# apply_and_suggest cuando las filas dejan 0 candidatas: las filas quedan aplicadas
+# y la respuesta lo informa (con `applied`) en lugar de fallar.
+#
+#   python3 -m pytest tools/test_apply_and_suggest.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import server  # noqa: E402
+
+server._configure_logging("WARNING")
+
+# "arosa" acertada y luego sin ninguna letra: ninguna palabra cumple ambas
+CONTRADICTION = [["arosa", "GGGGG"], ["arosa", "KKKKK"]]
+
+def test_zero_candidates_reports_applied_rows():
+    session = "test-apply-zero"
+    server.reset_session(session)
+    result = server.apply_and_suggest(session, feedback=CONTRADICTION)
+    assert result["candidates"] == 0
+    assert result["best"] is None and result["alternatives"] == []
+    assert [(r["guess"], r["feedback"]) for r in result["applied"]] == [tuple(r) for r in CONTRADICTION]
+    assert result["applied"][-1]["candidates_after"] == 0
+    # La sesion quedo con las filas aplicadas una sola vez
+    state = server.state(session)
+    assert len(state["history"]) == len(CONTRADICTION)
+
+def test_zero_candidates_stateless_returns_token():
+    result = server.apply_and_suggest("test-apply-zero-stateless", feedback=CONTRADICTION, history=[])
+    assert result["candidates"] == 0
+    assert result["history"] == [tuple(r) for r in CONTRADICTION]
+    assert "state_token" in result
@@ -0,0 +1,95 @@
+# tools/test_bench_solver.py
+# Regresiones de rendimiento de las rutas calientes del solver: las mismas
+# etapas y tamaños que tools/bench_solver.py, con un presupuesto por etapa.
+#
+#   python3 -m pytest tools/test_bench_solver.py                 # cronometro simple
+#   python3 -m pytest tools/test_bench_solver.py --benchmark-only  # con pytest-benchmark
+#
+# Con pytest-benchmark instalado se usa su fixture `benchmark` (estadisticas y
+# comparacion entre corridas); si no, cada caso se cronometra a mano. En ambos
+# casos la media por llamada debe quedar bajo BUDGET_MS * WORDLE_BENCH_SLACK.
+import os
+import random
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bench_solver  # noqa: E402
+from bench_solver import server  # noqa: E402
+
+SIZES = (1000, 10000, 30000, None)  # None = word.txt completo
+
+# Media maxima por llamada (ms) en el tamaño mas grande; holgura amplia para
+# que solo salten las regresiones de orden de magnitud, no el ruido de la maquina.
+BUDGET_MS = {
+    "pattern": 50,  # 1000 pares por llamada
+    "filter": 1000,
+    "filter_index": 5,
+    "entropy": 1500,
+    "best": 5000,
+    "diverse": 300,
+    "roundtrip": 4000,
+}
+SLACK = float(os.environ.get("WORDLE_BENCH_SLACK", "1"))
+FALLBACK_ROUNDS = 3
+
+@pytest.fixture(scope="module")
+def all_words():
+    saved_book, saved_cache = server._OPENING_BOOK, server._SUGGEST_CACHE.max_entries
+    server._OPENING_BOOK = server.OpeningBook()
+    server._SUGGEST_CACHE.max_entries = 0
+    with bench_solver.quiet():
+        words = server._make_wordlist(max_words=10**9)
+    yield words
+    server._OPENING_BOOK, server._SUGGEST_CACHE.max_entries = saved_book, saved_cache
+
+@pytest.fixture
+def bench(request):
+    """Devuelve run(fn) -> media en segundos, con pytest-benchmark si esta disponible."""
+    try:
+        benchmark = request.getfixturevalue("benchmark")
+    except pytest.FixtureLookupError:
+        benchmark = None
+
+    def run(fn):
+        with bench_solver.quiet():
+            if benchmark is not None:
+                benchmark(fn)
+                return benchmark.stats.stats.mean
+            fn()  # calentamiento: caches, matriz de patrones, pool de diversidad
+            t0 = time.perf_counter()
+            for _ in range(FALLBACK_ROUNDS):
+                fn()
+            return (time.perf_counter() - t0) / FALLBACK_ROUNDS
+    return run
+
+@pytest.mark.parametrize("stage", bench_solver.STAGES)
+@pytest.mark.parametrize("size", SIZES, ids=lambda s: "full" if s is None else str(s))
+def test_stage_within_budget(all_words, bench, size, stage):
+    d = bench_solver.make_dictionary(size, all_words)
+    fn, _ = bench_solver.stage_cases(d, random.Random(0))[stage]
+    mean_ms = bench(fn) * 1000
+    budget = BUDGET_MS[stage] * SLACK
+    assert mean_ms <= budget, f"{stage} con {len(d.words)} palabras: {mean_ms:.1f} ms > {budget:.0f} ms"
+
+# Plazos de suggest_guess(lookahead=True) a mitad de partida (~1200 candidatas en
+# word.txt tras "arosa" KYKKK): la llamada completa debe terminar dentro del plazo.
+DEADLINE_TOLERANCE = 1.15
+
+@pytest.mark.parametrize("deadline_ms", (50, 100))
+def test_lookahead_within_deadline(all_words, deadline_ms):
+    d = server._get_dictionary()
+    session = "bench-lookahead"
+    with bench_solver.quiet():
+        server.reset_session(session, d.language)
+        server.apply_feedback(session, "arosa", "KYKKK")
+        server.suggest_guess(session, lookahead=True, deadline_ms=deadline_ms)  # calentamiento
+        walls = []
+        for _ in range(FALLBACK_ROUNDS):
+            t0 = time.perf_counter()
+            server.suggest_guess(session, lookahead=True, deadline_ms=deadline_ms)
+            walls.append((time.perf_counter() - t0) * 1000)
+    limit = deadline_ms * DEADLINE_TOLERANCE * SLACK
+    assert max(walls) <= limit, f"lookahead con deadline_ms={deadline_ms}: {max(walls):.1f} ms > {limit:.0f} ms"